@@ -0,0 +1,111 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from hybrid_retrieval import tokenize
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase and collapse whitespace and trailing punctuation."""
+    question = " ".join(question.lower().split())
+    return re.sub(r"[\s?.!]+$", "", question)
+
+
+def question_identifiers(question: str) -> frozenset:
+    """Return the part numbers and numbers of a question: terms with a digit."""
+    return frozenset(
+        term for term in tokenize(question) if any(c.isdigit() for c in term)
+    )
+
+
+class AnswerCache:
+    """In-process cache of chat answers, scoped to an index version.
+
+    Questions are matched exactly after normalization, then by cosine
+    similarity of their query embeddings against the cached questions of the
+    same version that name the same part numbers and numbers, since
+    questions about different parts can embed almost identically. Entries expire after ``ttl_seconds`` and the least recently
+    used ones are evicted beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 512,
+    ):
+        self.embed_model = embed_model
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embed_model.get_query_embedding(question), "float32")
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _expire(self, now: float):
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if now - entry["created"] > self.ttl_seconds
+        ]:
+            del self._entries[key]
+
+    def lookup(self, version: str, question: str) -> Optional[str]:
+        """Return a cached answer for an equal or near-duplicate question."""
+        key = (version, normalize_question(question))
+        identifiers = question_identifiers(question)
+        with self._lock:
+            self._expire(time.time())
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["answer"]
+            candidates = [
+                (key, entry)
+                for key, entry in self._entries.items()
+                if key[0] == version and entry["identifiers"] == identifiers
+            ]
+
+        if candidates:
+            query = self._embed(question)
+            matrix = np.stack([entry["embedding"] for _, entry in candidates])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                best_key, best_entry = candidates[best]
+                with self._lock:
+                    if best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                    self.hits += 1
+                return best_entry["answer"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, version: str, question: str, answer: str):
+        """Cache the answer given to a question against an index version."""
+        entry = {
+            "answer": answer,
+            "embedding": self._embed(question),
+            "identifiers": question_identifiers(question),
+            "created": time.time(),
+        }
+        with self._lock:
+            key = (version, normalize_question(question))
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,63 @@
+"""Micro-benchmark: per-pattern word classification vs. PatternScanner.
+
+Usage: python bench_patterns.py [drawing.pdf] [--repeat N]
+"""
+
+import argparse
+import time
+
+import pdfplumber
+
+from extraction_config import pattern_scanner, patterns
+
+DEFAULT_PDF = "146464652-AA-036007-001.pdf"
+
+
+def per_pattern_word_pass(words):
+    categories = []
+    for word in words:
+        text = word.upper()
+        categories.append(
+            next((label for label, p in patterns.items() if p.search(text)), None)
+        )
+    return categories
+
+
+def scanner_word_pass(words):
+    # Start cold, as for a freshly uploaded drawing
+    pattern_scanner.first_category.cache_clear()
+    return [pattern_scanner.first_category(word.upper()) for word in words]
+
+
+def best_of(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdf", nargs="?", default=DEFAULT_PDF)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with pdfplumber.open(args.pdf) as pdf:
+        words = [word["text"] for word in pdf.pages[0].extract_words()]
+
+    # Both approaches must agree before their timings mean anything
+    assert scanner_word_pass(words) == per_pattern_word_pass(words)
+
+    print(f"{args.pdf}: {len(words)} words on page 1")
+    before = best_of(per_pattern_word_pass, words, args.repeat)
+    after = best_of(scanner_word_pass, words, args.repeat)
+    print(
+        f"word pass  per-pattern {before * 1000:8.2f} ms   "
+        f"scanner {after * 1000:8.2f} ms   speedup {before / after:5.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""Benchmark the datasheet and PMI pipelines on the bundled documents.
+
+The OpenAI LLM and embedding endpoints are replaced by deterministic local
+stubs, so runs are offline and repeatable. Each stage is timed best-of-N,
+then run once more under tracemalloc for its peak Python allocation. The
+results are compared against a baseline JSON; stages slower than the
+baseline by more than the tolerance are flagged and the exit status is 1.
+
+Usage: python bench_pipeline.py [--repeat N] [--tolerance 0.25] [--update-baseline]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, List
+
+import numpy as np
+import pdfplumber
+from llama_index.core import (
+    Settings,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import MockLLM
+from llama_index.core.schema import MetadataMode
+
+from datasheet_index import DOCS_DIR, EMBED_EXCLUDED_METADATA
+from disk_cache import DiskCache
+from extraction_config import pattern_scanner
+from hybrid_retrieval import BM25Index, HybridRetriever, tokenize
+from pdf_loader import iter_documents
+from pmi_merge import REGEX_FIELD_ALIASES
+from pmi_pipeline import (
+    LLM_CACHE_MAX_BYTES,
+    Extractor,
+    annotate_page,
+    extract_fields,
+    read_pdf_text,
+    regex_pass,
+)
+from word_index import PageWordIndex
+from word_store import PageWords
+
+DRAWING_PDF = "146464652-AA-036007-001.pdf"
+BASELINE_PATH = "bench_baseline.json"
+
+STUB_EMBED_DIM = 256
+RENDER_DPI = 100
+
+# Questions of the kind customers ask about the bundled datasheets
+QUESTIONS = [
+    "What is the output voltage range of the LM317?",
+    "What is the maximum input voltage?",
+    "How many ports does the Catalyst 9300 have?",
+    "What is the switching capacity of the Catalyst 9500?",
+    "What is the total harmonic distortion of the OPA134?",
+    "What is the dropout voltage of the TPS7A4501?",
+    "What is the operating temperature range?",
+    "Which power supplies are supported?",
+]
+
+
+class StubEmbedding(BaseEmbedding):
+    """Deterministic hashed bag-of-words embeddings, computed locally."""
+
+    def __init__(self, **kwargs):
+        super().__init__(model_name="stub-embedding", **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StubEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(STUB_EMBED_DIM, dtype="float32")
+        for term in tokenize(text):
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % STUB_EMBED_DIM] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+
+class StubResponses:
+    """Stands in for ``client.responses``: answers with the regex matches of the prompt.
+
+    Only the fields of the requested schema are answered.
+    """
+
+    def create(self, model, input, text):
+        user_text = input[-1]["content"]
+        fields = {
+            field_name: {"values": [], "notes": "", "sources": []}
+            for field_name in text["format"]["schema"]["required"]
+        }
+        for label, hits in regex_pass(user_text).items():
+            field_data = fields.get(REGEX_FIELD_ALIASES.get(label, label))
+            if field_data is None:
+                continue
+            for hit in sorted(set().union(*hits.values())):
+                field_data["values"].append(hit)
+                field_data["sources"].append(
+                    {"text": hit, "value": hit, "context": hit}
+                )
+        output_text = json.dumps(fields)
+        usage = SimpleNamespace(
+            input_tokens=len(user_text) // 4, output_tokens=len(output_text) // 4
+        )
+        return SimpleNamespace(output_text=output_text, usage=usage)
+
+
+class StubOpenAIClient:
+    """Offline stand-in for ``openai.OpenAI`` as used by the Extractor."""
+
+    def __init__(self):
+        self.responses = StubResponses()
+
+    def with_options(self, **kwargs):
+        return self
+
+
+# --- Stages ---
+# Each stage reads its inputs from ctx, stores its outputs there and returns
+# (items processed, unit) for the throughput figure.
+
+
+def stage_parse(ctx):
+    documents = [doc for docs in iter_documents(ctx["paths"]) for doc in docs]
+    for doc in documents:
+        doc.excluded_embed_metadata_keys.extend(EMBED_EXCLUDED_METADATA)
+    ctx["documents"] = documents
+    return len(documents), "pages"
+
+
+def stage_chunk(ctx):
+    ctx["nodes"] = Settings.node_parser.get_nodes_from_documents(ctx["documents"])
+    return len(ctx["nodes"]), "chunks"
+
+
+def stage_embed(ctx):
+    nodes = ctx["nodes"]
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    for node, vector in zip(
+        nodes, Settings.embed_model.get_text_embedding_batch(texts)
+    ):
+        node.embedding = vector
+    return len(nodes), "chunks"
+
+
+def stage_index_build(ctx):
+    index = VectorStoreIndex(ctx["nodes"])
+    index.storage_context.persist(persist_dir=ctx["persist_dir"])
+    ctx["bm25"] = BM25Index(ctx["nodes"])
+    return len(ctx["nodes"]), "chunks"
+
+
+def stage_index_load(ctx):
+    storage_context = StorageContext.from_defaults(persist_dir=ctx["persist_dir"])
+    ctx["index"] = load_index_from_storage(storage_context)
+    return len(ctx["nodes"]), "chunks"
+
+
+def stage_retrieve(ctx):
+    retriever = HybridRetriever(
+        ctx["index"].as_retriever(similarity_top_k=10), ctx["bm25"], top_k=2
+    )
+    for question in QUESTIONS:
+        retriever.retrieve(question)
+    return len(QUESTIONS), "queries"
+
+
+def stage_drawing_parse(ctx):
+    with pdfplumber.open(DRAWING_PDF) as pdf:
+        ctx["page_words"] = [
+            PageWords.from_dicts(page.extract_words()) for page in pdf.pages
+        ]
+        ctx["drawing_text"] = read_pdf_text(pdf)
+    return len(ctx["page_words"]), "pages"
+
+
+def stage_regex_pass(ctx):
+    text_blob = ctx["drawing_text"][0]
+    # Start cold, as for a freshly uploaded drawing
+    pattern_scanner.first_category.cache_clear()
+    regex_pass(text_blob)
+    for words in ctx["page_words"]:
+        words.classify(lambda text: pattern_scanner.first_category(text.upper()))
+    return len(text_blob), "chars"
+
+
+def stage_pmi_extract(ctx):
+    # A fresh cache each run so the stubbed LLM passes and the merge run
+    cache_path = os.path.join(ctx["tmp_dir"], f"llm-{time.time_ns()}.sqlite")
+    cache = DiskCache(cache_path, LLM_CACHE_MAX_BYTES)
+    extractor = Extractor(StubOpenAIClient(), cache)
+    text_blob, notes_blob, pages = ctx["drawing_text"]
+    ctx["extraction"] = extract_fields(extractor, text_blob, notes_blob, pages)
+    return 1, "drawings"
+
+
+def stage_locate(ctx):
+    word_indexes = [PageWordIndex(words) for words in ctx["page_words"]]
+    lookups = 0
+    boxes = [[] for _ in word_indexes]
+    for field_data in ctx["extraction"]["merged"].values():
+        for source in field_data.get("sources", []):
+            lookups += 1
+            for page_number, word_index in enumerate(word_indexes):
+                location = word_index.locate(source["text"], source["context"])
+                if location:
+                    boxes[page_number].append(
+                        {**location, "color": (255, 0, 0), "width": 3, "padding": 0}
+                    )
+                    break
+    ctx["boxes"] = boxes
+    return lookups, "lookups"
+
+
+def stage_render(ctx):
+    with pdfplumber.open(DRAWING_PDF) as pdf:
+        ctx["images"] = [
+            page.to_image(resolution=RENDER_DPI).original.convert("RGB")
+            for page in pdf.pages
+        ]
+    return len(ctx["images"]), "pages"
+
+
+def stage_annotate(ctx):
+    for image, boxes in zip(ctx["images"], ctx["boxes"]):
+        annotate_page(image.copy(), boxes, RENDER_DPI)
+    return len(ctx["images"]), "pages"
+
+
+STAGES = [
+    ("parse", stage_parse),
+    ("chunk", stage_chunk),
+    ("embed", stage_embed),
+    ("index_build", stage_index_build),
+    ("index_load", stage_index_load),
+    ("retrieve", stage_retrieve),
+    ("drawing_parse", stage_drawing_parse),
+    ("regex_pass", stage_regex_pass),
+    ("pmi_extract", stage_pmi_extract),
+    ("locate", stage_locate),
+    ("render", stage_render),
+    ("annotate", stage_annotate),
+]
+
+
+def measure(stage: Callable, ctx: dict, repeat: int) -> dict:
+    """Return best-of-repeat wall time, throughput and peak allocation of a stage."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items, unit = stage(ctx)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+
+    # Measured separately so tracemalloc overhead stays out of the timings
+    tracemalloc.start()
+    try:
+        stage(ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": round(best, 6),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / best, 2) if best else None,
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Return the stages slower than the baseline by more than tolerance."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("stages", {}).get(name)
+        if before and result["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown over the baseline, as a fraction",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write these results as the new baseline",
+    )
+    args = parser.parse_args(argv)
+
+    Settings.embed_model = StubEmbedding()
+    Settings.llm = MockLLM()
+
+    paths = sorted(glob.glob(os.path.join(DOCS_DIR, "*.pdf")))
+    corpus_mb = sum(os.path.getsize(path) for path in paths) / 2**20
+    print(f"{len(paths)} datasheets ({corpus_mb:.1f} MB) and {DRAWING_PDF}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ctx = {
+            "paths": paths,
+            "tmp_dir": tmp_dir,
+            "persist_dir": os.path.join(tmp_dir, "index"),
+        }
+        for name, stage in STAGES:
+            results[name] = measure(stage, ctx, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+
+    print(
+        f"{'stage':14s} {'ms':>10s} {'throughput':>20s} {'peak MB':>9s} {'vs base':>8s}"
+    )
+    for name, result in results.items():
+        before = baseline.get("stages", {}).get(name)
+        change = (
+            f"{result['seconds'] / before['seconds']:7.2f}x" if before else "      -"
+        )
+        flag = "  REGRESSION" if name in regressions else ""
+        throughput = f"{result['throughput']:.1f} {result['unit']}/s"
+        print(
+            f"{name:14s} {result['seconds'] * 1000:10.1f} {throughput:>20s} "
+            f"{result['peak_mb']:9.2f} {change}{flag}"
+        )
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss_mb = max_rss / (2**20 if sys.platform == "darwin" else 2**10)
+    print(f"peak RSS {max_rss_mb:.1f} MB")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "repeat": args.repeat,
+                    "stages": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"no baseline at {args.baseline}; run with --update-baseline")
+    elif regressions:
+        print(f"regressions over {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+from llama_index.core import (
+    Settings,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
+
+from pdf_loader import iter_documents
+
+DOCS_DIR = "uploaded_docs"
+INDEX_DIR = "index_storage"
+MANIFEST_FILE = "manifest.json"
+EMBED_EXCLUDED_METADATA = ["file_path", "page_label"]
+
+# Sessions share one on-disk store, so only one of them may rewrite it at a time
+_sync_lock = threading.Lock()
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_directory(
+    docs_dir: str = DOCS_DIR, previous: Optional[Dict[str, dict]] = None
+) -> Dict[str, dict]:
+    """Fingerprint every file by size, mtime and SHA-256.
+
+    Files whose size and mtime match the previous fingerprint keep their
+    recorded hash, so unchanged files are never re-read.
+    """
+    previous = previous or {}
+    fingerprints = {}
+    if not os.path.isdir(docs_dir):
+        return fingerprints
+
+    for name in sorted(os.listdir(docs_dir)):
+        path = os.path.join(docs_dir, name)
+        if not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        known = previous.get(name)
+        if (
+            known
+            and known["size"] == stat.st_size
+            and known["mtime"] == stat.st_mtime_ns
+        ):
+            sha256 = known["sha256"]
+        else:
+            sha256 = hash_file(path)
+        fingerprints[name] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": sha256,
+        }
+    return fingerprints
+
+
+def corpus_hash(fingerprints: Dict[str, dict]) -> Optional[str]:
+    """Hash file names and contents into a single corpus version."""
+    if not fingerprints:
+        return None
+
+    digest = hashlib.sha256()
+    for name in sorted(fingerprints):
+        digest.update(name.encode("utf-8"))
+        digest.update(fingerprints[name]["sha256"].encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_manifest(persist_dir: str = INDEX_DIR) -> Dict[str, dict]:
+    """Return the per-file manifest of the persisted index."""
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)["files"]
+
+
+def save_manifest(files: Dict[str, dict], persist_dir: str = INDEX_DIR):
+    """Atomically write the per-file manifest next to the persisted index."""
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": corpus_hash(files), "files": files}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_index(persist_dir: str = INDEX_DIR) -> Optional[VectorStoreIndex]:
+    """Load the persisted index, if one exists."""
+    if not os.path.exists(os.path.join(persist_dir, MANIFEST_FILE)):
+        return None
+
+    storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+    return load_index_from_storage(storage_context)
+
+
+def sync_index(
+    docs_dir: str = DOCS_DIR,
+    persist_dir: str = INDEX_DIR,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[VectorStoreIndex, Dict[str, List[str]]]:
+    """Bring the persisted index in line with the document directory.
+
+    Only new or changed files are embedded, and nodes of removed or changed
+    files are deleted, so the cost scales with the change rather than the
+    corpus. Pages are parsed in parallel and embedded as they arrive, with
+    ``progress`` called as (pages done, total pages). Returns the index and
+    the file names that were added, updated, removed and failed.
+
+    Files that cannot be parsed are skipped and recorded in the manifest with
+    no documents and the error, so they are not re-parsed until they change.
+    """
+    with _sync_lock:
+        index = load_index(persist_dir)
+        manifest = load_manifest(persist_dir) if index is not None else {}
+        if index is None:
+            index = VectorStoreIndex(nodes=[])
+
+        current = fingerprint_directory(docs_dir, manifest)
+        changes = {
+            "added": [name for name in current if name not in manifest],
+            "updated": [
+                name
+                for name in current
+                if name in manifest
+                and manifest[name]["sha256"] != current[name]["sha256"]
+            ],
+            "removed": [name for name in manifest if name not in current],
+            "failed": [],
+        }
+
+        for name in changes["removed"] + changes["updated"]:
+            for doc_id in manifest[name].get("doc_ids", []):
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+
+        changed = changes["added"] + changes["updated"]
+        for name in current:
+            if name in changed:
+                current[name]["doc_ids"] = []
+                continue
+            current[name]["doc_ids"] = manifest[name].get("doc_ids", [])
+            if "error" in manifest[name]:
+                current[name]["error"] = manifest[name]["error"]
+
+        def record_failure(path: str, error: Exception):
+            name = os.path.basename(path)
+            changes["failed"].append(name)
+            current[name]["error"] = f"{type(error).__name__}: {error}"
+
+        paths = [os.path.join(docs_dir, name) for name in changed]
+        for docs in iter_documents(paths, progress=progress, on_error=record_failure):
+            for doc in docs:
+                # Keep per-file metadata out of the embedded text so boilerplate
+                # shared between datasheets maps to the same cached embedding
+                doc.excluded_embed_metadata_keys.extend(EMBED_EXCLUDED_METADATA)
+                current[doc.metadata["file_name"]]["doc_ids"].append(doc.doc_id)
+            index.insert_nodes(Settings.node_parser.get_nodes_from_documents(docs))
+            for doc in docs:
+                index.docstore.set_document_hash(doc.doc_id, doc.hash)
+
+        # Drop the pages a failed file yielded before its failure
+        for name in changes["failed"]:
+            for doc_id in current[name]["doc_ids"]:
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+            current[name]["doc_ids"] = []
+
+        if any(changes.values()):
+            os.makedirs(persist_dir, exist_ok=True)
+            index.storage_context.persist(persist_dir=persist_dir)
+        if current != manifest and os.path.isdir(persist_dir):
+            # Also records fresh mtimes so re-uploaded identical files skip hashing
+            save_manifest(current, persist_dir)
+
+        return index, changes
+
+
+def current_version(
+    docs_dir: str = DOCS_DIR, persist_dir: str = INDEX_DIR
+) -> Optional[str]:
+    """Return the corpus version of the document directory as it is on disk."""
+    return corpus_hash(fingerprint_directory(docs_dir, load_manifest(persist_dir)))
+
+
+class IndexLease:
+    """A session's hold on a shared registry entry.
+
+    The reference is released when the lease is released explicitly or when
+    it is garbage collected along with the session state that owns it.
+    """
+
+    def __init__(self, registry: "IndexRegistry", version: str, value):
+        self.version = version
+        self.value = value
+        self._finalizer = weakref.finalize(self, registry.release, version)
+
+    def release(self):
+        self._finalizer()
+
+
+class IndexRegistry:
+    """Process-wide, reference-counted registry of loaded indexes.
+
+    Entries are keyed by corpus version and built at most once, so every
+    session on the same document set shares one read-only copy. Entries are
+    dropped from memory when their last lease is released.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def acquire(self, version: str, build: Callable[[], object]) -> IndexLease:
+        """Lease the entry for version, calling build() only if it is not loaded."""
+        with self._lock:
+            build_lock = self._build_locks.setdefault(version, threading.Lock())
+
+        # Sessions asking for the same version wait for a single build
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(version)
+                if entry is not None:
+                    entry["refs"] += 1
+                    return IndexLease(self, version, entry["value"])
+
+            value = build()
+            with self._lock:
+                entry = self._entries.setdefault(version, {"value": value, "refs": 0})
+                entry["refs"] += 1
+                return IndexLease(self, version, entry["value"])
+
+    def release(self, version: str):
+        """Drop one reference, unloading the entry when none remain."""
+        with self._lock:
+            entry = self._entries.get(version)
+            if entry is None:
+                return
+            entry["refs"] -= 1
+            if entry["refs"] <= 0:
+                del self._entries[version]
+                self._build_locks.pop(version, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the reference count of every loaded version."""
+        with self._lock:
+            return {version: entry["refs"] for version, entry in self._entries.items()}
@@ -0,0 +1,90 @@
+import hashlib
+import os
+from array import array
+from typing import List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from disk_cache import CACHE_DIR, DiskCache
+
+EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite")
+EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so layout-only differences share a cache entry."""
+    return " ".join(text.split())
+
+
+def embedding_key(text: str, model_name: str, kind: str = "text") -> str:
+    """Content address of an embedding: model, text or query, normalized text."""
+    payload = "\0".join([model_name, kind, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper that never embeds the same chunk twice.
+
+    Vectors are looked up in a content-addressed ``DiskCache`` shared by all
+    sessions and documents; only the misses of each batch reach the wrapped
+    model.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: DiskCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: DiskCache, **kwargs):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [embedding_key(text, self.model_name, kind) for text in texts]
+        cached = self._cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            if kind == "query":
+                vectors = [self._inner.get_query_embedding(t) for t in missing.values()]
+            else:
+                vectors = self._inner.get_text_embedding_batch(list(missing.values()))
+            fresh = {key: _pack(vector) for key, vector in zip(missing, vectors)}
+            self._cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [_unpack(cached[key]) for key in keys]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query], "query")[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text], "text")[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "text")
@@ -1,115 +1,207 @@
+import hashlib
+import json
 import re
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
-# --- Define regex patterns ---
-patterns = {
-    "material": re.compile(
-        r"\b(STL|Steel|SS\s?(304|316)?|Al(?:uminum)?\s?6061|Brass|Bronze|ABS|PEEK)\b",
-        re.I,
-    ),
-    "finish": re.compile(
-        r"\b(Anodized|Black Oxide|Powder Coat|Zinc Plated|Hot Dip|Ra\s?\d+(\.\d+)?(\s?(μm|um|microns)?))\b",
-        re.I,
+import numpy as np
+
+
+class PatternScanner:
+    """Classify short strings such as page words by the patterns in ``patterns``.
+
+    ``first_category`` uses one combined regex, where the first alternative
+    that matches anywhere wins, and memoizes the result per distinct string,
+    since drawing words repeat heavily. Whole-document text is better served
+    by each pattern's own C-level scan, which the combined regex cannot beat
+    in CPython's backtracking engine (see bench_patterns.py).
+    """
+
+    def __init__(self, patterns: Dict[str, re.Pattern], cache_size: int = 65536):
+        flags = {pattern.flags for pattern in patterns.values()}
+        if len(flags) != 1:
+            raise ValueError("All patterns must be compiled with the same flags")
+
+        self.patterns = patterns
+        self.combined = re.compile(
+            "|".join(
+                f"(?s:.*?)(?P<{label}>{pattern.pattern})"
+                for label, pattern in patterns.items()
+            ),
+            flags.pop(),
+        )
+        self.first_category = lru_cache(maxsize=cache_size)(self._first_category)
+
+    def _first_category(self, text: str) -> Optional[str]:
+        """Return the first category, in pattern order, that matches the text."""
+        match = self.combined.match(text)
+        return match.lastgroup if match else None
+
+
+# --- Classification Criteria ---
+# Range tables: values are bucketed into right-closed bins between
+# consecutive edges, the first bin also closed on the left, and labelled.
+DIAMETER_RANGES = {
+    "unit": "in",
+    "edges": [6, 8, 10, 12],
+    "labels": ["Class A Pipe", "Class B Pipe", "Class C Pipe"],
+}
+# Thread ranges in millimetres, by the thread type named in the value
+THREAD_RANGES = {
+    "stud": {
+        "edges": [-np.inf, 20, np.inf],
+        "labels": ["Light Duty Stud", "Heavy Duty Stud"],
+    },
+    "anchor": {
+        "edges": [-np.inf, 25, np.inf],
+        "labels": ["Standard Anchor", "Heavy Duty Anchor"],
+    },
+    "hole": {
+        "edges": [-np.inf, 20, np.inf],
+        "labels": ["Standard Hole", "Large Hole"],
+    },
+}
+
+# Millimetres per unit; sizes without a unit are millimetres
+MM_PER_UNIT = {"mm": 1.0, "in": 25.4, "inch": 25.4}
+
+# Material rules in priority order: (keywords, [(grade, label), ...], default)
+MATERIAL_RULES = [
+    (
+        ["STAINLESS", "SS"],
+        [("304", "Standard Stainless"), ("316", "Marine Grade Stainless")],
+        "General Stainless",
     ),
-    "general_tolerance": re.compile(r"(±|\+/-)\s?\d+(\.\d+)?(\s?(mm|in|inch)?)", re.I),
-    "surface_roughness": re.compile(r"Ra\s?\d+(\.\d+)?\s?(μm|um|microns)?", re.I),
-    "threads": re.compile(
-        r"\b(M\d+(\.\d+)?(x\d+(\.\d+)?)?|UNC\s?\d+-\d+|UNF\s?\d+-\d+|BSPT|NPT)\b", re.I
+    (
+        ["ALUMINUM", "AL"],
+        [("6061", "Aircraft Grade Aluminum")],
+        "General Aluminum",
     ),
-    "diameters": re.compile(r"(⌀|\bDIA\b)\s?\d+(\.\d+)?", re.I),
-    "weld_notes": re.compile(r"\bWELD(ING)?\b.*", re.I),
-    "standards": re.compile(r"\b(AWS|ASME|ASTM|DIN|SAES|AMSS|ISO)-?[A-Z0-9]+\b", re.I),
-}
+    (["BRASS"], [], "Decorative/Corrosion Resistant"),
+    (["BRONZE"], [], "High Strength/Corrosion Resistant"),
+    (["PEEK"], [], "High Performance Plastic"),
+]
 
+DIAMETER_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*(mm|in|inch)?", re.I)
+# Thread units are matched case-sensitively, as they always have been
+THREAD_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*(mm|in|inch)?")
+THREAD_TYPE = re.compile(r"(Stud|Anchor|Hole|Bolt)", re.I)
 
-# --- Classification Criteria ---
-def classify_diameter(value: str) -> Optional[List[str]]:
-    """Classify pipe diameters into categories based on size ranges."""
-    # Extract numeric value and unit
-    matches = re.finditer(r"(\d+(?:\.\d+)?)\s*(mm|in|inch)?", value, re.IGNORECASE)
-    classifications = set()
+# Joins values for a single regex pass; neither digits nor \s match it
+_SEPARATOR = "\0"
+
+
+def _owners(values: List[str], positions: List[int]) -> np.ndarray:
+    """Map positions in the joined values back to value indexes."""
+    lengths = np.array([len(value) + 1 for value in values])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.searchsorted(starts, positions, side="right") - 1
+
+
+def parse_sizes(
+    values: List[str], pattern: re.Pattern, unit: str, lower_units: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (value index, size in unit) for every number in every value."""
+    positions, sizes, found_units = [], [], []
+    for match in pattern.finditer(_SEPARATOR.join(values)):
+        found = match.group(2) or "mm"
+        positions.append(match.start())
+        sizes.append(float(match.group(1)))
+        found_units.append(MM_PER_UNIT.get(found.lower() if lower_units else found))
+    owners = _owners(values, positions) if positions else np.empty(0, np.intp)
+
+    sizes = np.array(sizes, dtype=float)
+    per_unit = np.array(found_units, dtype=float)
+    target = MM_PER_UNIT[unit]
+    # Sizes already in the target unit are left untouched, not round-tripped
+    return owners, np.where(per_unit == target, sizes, sizes * per_unit / target)
+
+
+def bucketize(sizes: np.ndarray, edges: List[float]) -> np.ndarray:
+    """Return each size's bin index in a range table, or -1 outside all bins."""
+    edges = np.asarray(edges, dtype=float)
+    bins = np.searchsorted(edges, sizes, side="left") - 1
+    bins[sizes == edges[0]] = 0
+    bins[(sizes < edges[0]) | (sizes > edges[-1])] = -1
+    return bins
 
-    for match in matches:
-        size, unit = float(match.group(1)), match.group(2) or "mm"
 
-        # Convert to inches for consistent comparison
-        if unit.lower() in ["mm", "millimeter"]:
-            size = size / 25.4
+def _collect(count: int, owners: np.ndarray, labels: np.ndarray) -> List[List[str]]:
+    """Group labels by the value they came from, deduplicated and sorted."""
+    found = [set() for _ in range(count)]
+    for owner, label in zip(owners.tolist(), labels.tolist()):
+        found[owner].add(label)
+    return [sorted(labels) for labels in found]
 
-        if 6 <= size <= 8:
-            classifications.add("Class A Pipe")
-        elif 8 < size <= 10:
-            classifications.add("Class B Pipe")
-        elif 10 < size <= 12:
-            classifications.add("Class C Pipe")
 
-    return list(classifications) if classifications else None
+def classify_diameters(values: List[str]) -> List[List[str]]:
+    """Classify pipe diameters into size classes, for many values at once."""
+    owners, sizes = parse_sizes(
+        values, DIAMETER_SIZE, DIAMETER_RANGES["unit"], lower_units=True
+    )
+    bins = bucketize(sizes, DIAMETER_RANGES["edges"])
+    labels = np.array(DIAMETER_RANGES["labels"], dtype=object)
+    keep = bins >= 0
+    return _collect(len(values), owners[keep], labels[bins[keep]])
 
 
-def classify_thread(value: str) -> Optional[str]:
+def classify_threads(values: List[str]) -> List[List[str]]:
+    """Classify threads by type and size, for many values at once."""
+    joined = _SEPARATOR.join(values)
+    types = np.full(len(values), "unknown", dtype=object)
+    type_matches = list(THREAD_TYPE.finditer(joined))
+    if type_matches:
+        owners = _owners(values, [match.start() for match in type_matches])
+        # The first type named in each value decides its ranges
+        owners, first = np.unique(owners, return_index=True)
+        types[owners] = [type_matches[i].group(1).lower() for i in first]
+
+    owners, sizes = parse_sizes(values, THREAD_SIZE, "mm")
+    all_owners, all_labels = [], []
+    for thread_type, ranges in THREAD_RANGES.items():
+        selected = types[owners] == thread_type
+        bins = bucketize(sizes[selected], ranges["edges"])
+        keep = bins >= 0
+        all_owners.append(owners[selected][keep])
+        all_labels.append(np.array(ranges["labels"], dtype=object)[bins[keep]])
+    return _collect(len(values), np.concatenate(all_owners), np.concatenate(all_labels))
+
+
+def classify_materials(values: List[str]) -> List[List[str]]:
+    """Classify materials by family and grade, for many values at once."""
+    upper = np.array([value.upper() for value in values], dtype=str)
+    result = np.full(len(values), None, dtype=object)
+    assigned = np.zeros(len(values), dtype=bool)
+    for keywords, grades, default in MATERIAL_RULES:
+        matched = np.zeros(len(values), dtype=bool)
+        for keyword in keywords:
+            matched |= np.char.find(upper, keyword) >= 0
+        # The first rule that matches a value decides its label
+        matched &= ~assigned
+        labels = np.full(len(values), default, dtype=object)
+        # Earlier grades win, so assign them last
+        for grade, label in reversed(grades):
+            labels[np.char.find(upper, grade) >= 0] = label
+        result[matched] = labels[matched]
+        assigned |= matched
+    return [[label] if label else [] for label in result]
+
+
+def classify_diameter(value: str) -> Optional[List[str]]:
+    """Classify pipe diameters into categories based on size ranges."""
+    return classify_diameters([value])[0] or None
+
+
+def classify_thread(value: str) -> Optional[List[str]]:
     """Classify threads based on size and type."""
-    # Extract numeric value and type
-    size_matches = re.finditer(r"(\d+(?:\.\d+)?)\s*(mm|in|inch)?", value)
-    type_match = re.search(r"(Stud|Anchor|Hole|Bolt)", value, re.I)
-    classifications = set()
-
-    thread_type = type_match.group(1).lower() if type_match else "unknown"
-
-    for match in size_matches:
-        size, unit = float(match.group(1)), match.group(2) or "mm"
-
-        # Convert to mm for consistent comparison
-        if unit in ["in", "inch"]:
-            size = size * 25.4
-
-        if thread_type == "stud":
-            if size <= 20:
-                classifications.add("Light Duty Stud")
-            else:
-                classifications.add("Heavy Duty Stud")
-        elif thread_type == "anchor":
-            if size <= 25:
-                classifications.add("Standard Anchor")
-            else:
-                classifications.add("Heavy Duty Anchor")
-        elif thread_type == "hole":
-            if size <= 20:
-                classifications.add("Standard Hole")
-            else:
-                classifications.add("Large Hole")
-
-    return list(classifications) if classifications else None
+    return classify_threads([value])[0] or None
 
 
 def classify_material(value: str) -> Optional[str]:
     """Classify materials based on type and grade."""
-    value = value.upper()
-
-    if "STAINLESS" in value or "SS" in value:
-        if "304" in value:
-            return "Standard Stainless"
-        elif "316" in value:
-            return "Marine Grade Stainless"
-        return "General Stainless"
-    elif "ALUMINUM" in value or "AL" in value:
-        if "6061" in value:
-            return "Aircraft Grade Aluminum"
-        return "General Aluminum"
-    elif "BRASS" in value:
-        return "Decorative/Corrosion Resistant"
-    elif "BRONZE" in value:
-        return "High Strength/Corrosion Resistant"
-    elif "PEEK" in value:
-        return "High Performance Plastic"
-    return None
-
-
-# Classification mapping for each field type
-CLASSIFICATION_MAPPING = {
-    "diameters": classify_diameter,
-    "threads": classify_thread,
-    "material": classify_material,
-}
+    labels = classify_materials([value])[0]
+    return labels[0] if labels else None
+
 
 # Classification colors for UI
 CLASSIFICATION_COLORS = {
@@ -135,219 +227,256 @@ CLASSIFICATION_COLORS = {
     "High Performance Plastic": "#E6E6FA",  # Lavender
 }
 
-# --- Schema Definition ---
-shared_schema = {
-    "type": "object",
-    "properties": {
-        "material": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "finish": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "general_tolerance": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "surface_roughness": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "threads": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "diameters": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "weld_requirements": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "standards": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-        "cost_drivers": {
-            "type": "object",
-            "properties": {
-                "values": {"type": "array", "items": {"type": "string"}},
-                "notes": {"type": "string"},
-                "sources": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "text": {"type": "string"},
-                            "value": {"type": "string"},
-                            "context": {"type": "string"},
-                        },
-                        "required": ["text", "value", "context"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            "required": ["values", "notes", "sources"],
-            "additionalProperties": False,
-        },
-    },
-    "required": [
+
+# --- Field registry ---
+class Field(NamedTuple):
+    """One extracted field: its schema entry, regex, UI section and classifier."""
+
+    name: str
+    title: str
+    # UI column the field's section is rendered in
+    column: int
+    # Position of the field's section in the UI, independent of schema order
+    display_order: int
+    pattern: Optional[re.Pattern] = None
+    # Category name of the regex hits, if it differs from the field name
+    pattern_label: Optional[str] = None
+    # Uppercase words that suggest a text may hold values of the field
+    keywords: Tuple[str, ...] = ()
+    # Batch classifier: values in, one label list per value out
+    classifier: Optional[Callable[[List[str]], List[List[str]]]] = None
+    classification_help: str = ""
+
+
+# In schema order, which is also regex pattern order
+FIELDS = [
+    Field(
         "material",
+        "Material",
+        0,
+        0,
+        re.compile(
+            r"\b(STL|Steel|SS\s?(304|316)?|Al(?:uminum)?\s?6061|Brass|Bronze|ABS|PEEK)\b",
+            re.I,
+        ),
+        keywords=(
+            "MATERIAL",
+            "MATL",
+            "STEEL",
+            "STAINLESS",
+            "ALUMIN",
+            "ALLOY",
+            "BRASS",
+            "BRONZE",
+            "COPPER",
+            "TITANIUM",
+            "PLASTIC",
+            "NYLON",
+            "DELRIN",
+            "IRON",
+        ),
+        classifier=classify_materials,
+        classification_help=(
+            "Standard Stainless: 304 series, Marine Grade: 316 series, General "
+            "Stainless: Other grades, Aircraft Aluminum: 6061, General Aluminum: "
+            "Other grades, Brass: Decorative/Corrosion Resistant, Bronze: High "
+            "Strength/Corrosion Resistant, PEEK: High Performance Plastic"
+        ),
+    ),
+    Field(
         "finish",
+        "Surface Treatment",
+        0,
+        1,
+        re.compile(
+            r"\b(Anodized|Black Oxide|Powder Coat|Zinc Plated|Hot Dip|Ra\s?\d+(\.\d+)?(\s?(μm|um|microns)?))\b",
+            re.I,
+        ),
+        keywords=(
+            "FINISH",
+            "COAT",
+            "PAINT",
+            "PLAT",
+            "ANODIZ",
+            "PASSIVAT",
+            "GALVANIZ",
+            "OXIDE",
+            "SURFACE",
+        ),
+    ),
+    Field(
         "general_tolerance",
+        "Tolerances",
+        0,
+        2,
+        re.compile(r"(±|\+/-)\s?\d+(\.\d+)?(\s?(mm|in|inch)?)", re.I),
+        keywords=("TOLERANC", "±", "+/-", "UNLESS OTHERWISE"),
+    ),
+    Field(
         "surface_roughness",
+        "Surface Roughness",
+        0,
+        3,
+        re.compile(r"Ra\s?\d+(\.\d+)?\s?(μm|um|microns)?", re.I),
+        keywords=("ROUGHNESS", "SURFACE", "RMS"),
+    ),
+    Field(
         "threads",
+        "Threads",
+        0,
+        4,
+        re.compile(
+            r"\b(M\d+(\.\d+)?(x\d+(\.\d+)?)?|UNC\s?\d+-\d+|UNF\s?\d+-\d+|BSPT|NPT)\b",
+            re.I,
+        ),
+        keywords=("THREAD", "THD", "TAP", "UNC", "UNF", "NPT", "BSP"),
+        classifier=classify_threads,
+        classification_help=(
+            "Light Duty Stud: ≤20mm, Heavy Duty Stud: >20mm, Standard Anchor: "
+            "≤25mm, Heavy Duty Anchor: >25mm, Standard Hole: ≤20mm, Large Hole: >20mm"
+        ),
+    ),
+    Field(
         "diameters",
+        "Diameters",
+        1,
+        5,
+        re.compile(r"(⌀|\bDIA\b)\s?\d+(\.\d+)?", re.I),
+        keywords=("DIA", "Ø", "⌀", "BORE", "PIPE"),
+        classifier=classify_diameters,
+        classification_help=(
+            "Class A: 6-8 inch pipe, Class B: 8-10 inch pipe, Class C: 10-12 inch pipe"
+        ),
+    ),
+    Field(
         "weld_requirements",
+        "Weld Requirements",
+        1,
+        7,
+        re.compile(r"\bWELD(ING)?\b.*", re.I),
+        pattern_label="weld_notes",
+        keywords=("WELD", "FILLET", "BRAZ", "SOLDER"),
+    ),
+    Field(
         "standards",
-        "cost_drivers",
-    ],
+        "Standards",
+        1,
+        6,
+        re.compile(r"\b(AWS|ASME|ASTM|DIN|SAES|AMSS|ISO)-?[A-Z0-9]+\b", re.I),
+        keywords=("ASTM", "ASME", "AWS", "ANSI", "ISO", "DIN", "SAE", "MIL-", "SPEC"),
+    ),
+    Field("cost_drivers", "Cost Drivers", 1, 8),
+]
+
+FIELDS_BY_NAME = {field.name: field for field in FIELDS}
+FIELD_NAMES = tuple(FIELDS_BY_NAME)
+
+# Regex patterns by category, in field order
+patterns = {
+    field.pattern_label or field.name: field.pattern
+    for field in FIELDS
+    if field.pattern is not None
+}
+pattern_scanner = PatternScanner(patterns)
+
+# Batch classifier for each field type: values in, one label list per value out
+CLASSIFICATION_MAPPING = {
+    field.name: field.classifier for field in FIELDS if field.classifier is not None
+}
+
+
+def route_fields(text: str, always: Sequence[str] = ()) -> List[str]:
+    """Return the fields a text may hold values of, in schema order.
+
+    A field is routed when its regex matches the text or one of its
+    keywords occurs in it, and the always fields are routed regardless.
+    Fields with neither a pattern nor keywords are only ever routed through
+    always.
+    """
+    upper = text.upper()
+    routed = set(always)
+    for field in FIELDS:
+        if field.name in routed:
+            continue
+        if any(keyword in upper for keyword in field.keywords) or (
+            field.pattern is not None and field.pattern.search(text)
+        ):
+            routed.add(field.name)
+    return [name for name in FIELD_NAMES if name in routed]
+
+
+# UI sections as (title, field name) per column, in display order
+UI_SECTIONS = [
+    [
+        (field.title, field.name)
+        for field in sorted(FIELDS, key=lambda field: field.display_order)
+        if field.column == column
+    ]
+    for column in range(max(field.column for field in FIELDS) + 1)
+]
+
+
+# --- Schema Definition ---
+FIELD_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "values": {"type": "array", "items": {"type": "string"}},
+        "notes": {"type": "string"},
+        "sources": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "text": {"type": "string"},
+                    "value": {"type": "string"},
+                    "context": {"type": "string"},
+                },
+                "required": ["text", "value", "context"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["values", "notes", "sources"],
     "additionalProperties": False,
 }
+
+
+class CompiledSchema(NamedTuple):
+    """A response schema over some fields, hashed once."""
+
+    fields: Tuple[str, ...]
+    schema: dict
+    hash: str
+
+
+def build_schema(field_names: Sequence[str]) -> dict:
+    """Return the structured-output schema requiring the given fields."""
+    return {
+        "type": "object",
+        "properties": {name: FIELD_SCHEMA for name in field_names},
+        "required": list(field_names),
+        "additionalProperties": False,
+    }
+
+
+@lru_cache(maxsize=None)
+def _compile(field_names: Tuple[str, ...]) -> CompiledSchema:
+    schema = build_schema(field_names)
+    serialized = json.dumps(schema, sort_keys=True)
+    digest = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+    return CompiledSchema(field_names, schema, digest)
+
+
+def compiled_schema(field_names: Optional[Sequence[str]] = None) -> CompiledSchema:
+    """Return the compiled schema for a subset of fields, or for all of them.
+
+    Fields are put in registry order, so any ordering of the same subset
+    gives the same schema and hash. Unknown field names raise KeyError.
+    """
+    if field_names is None:
+        return _compile(FIELD_NAMES)
+    unknown = set(field_names) - set(FIELD_NAMES)
+    if unknown:
+        raise KeyError(f"Unknown fields: {sorted(unknown)}")
+    wanted = set(field_names)
+    return _compile(tuple(name for name in FIELD_NAMES if name in wanted))
@@ -0,0 +1,113 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence
+
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+
+# Part numbers and spec labels keep their inner dashes, dots and slashes
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, keeping compound part numbers whole.
+
+    Compound tokens such as "c9300-48p" are also indexed by their parts, so
+    both "C9300-48P" and "C9300" match.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        parts = re.split(r"[-./]", token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part)
+    return terms
+
+
+class BM25Index:
+    """In-memory inverted index scoring nodes with Okapi BM25."""
+
+    def __init__(self, nodes: Sequence[BaseNode], k1: float = 1.5, b: float = 0.75):
+        self.nodes = list(nodes)
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+        self.lengths = []
+        for position, node in enumerate(self.nodes):
+            terms = tokenize(node.get_content())
+            self.lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self.postings[term].append((position, count))
+
+        total = len(self.nodes)
+        self.avg_length = sum(self.lengths) / total if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int) -> List[NodeWithScore]:
+        """Return the top_k nodes for the query terms, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, count in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[position] / self.avg_length
+                scores[position] += (
+                    idf * count * (self.k1 + 1) / (count + self.k1 * norm)
+                )
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [NodeWithScore(node=self.nodes[pos], score=score) for pos, score in best]
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[List[NodeWithScore]], k: int = 60
+) -> List[NodeWithScore]:
+    """Fuse ranked lists by summing 1 / (k + rank) per node."""
+    scores = defaultdict(float)
+    nodes = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            node_id = result.node.node_id
+            scores[node_id] += 1.0 / (k + rank)
+            nodes.setdefault(node_id, result.node)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [
+        NodeWithScore(node=nodes[node_id], score=score) for node_id, score in ranked
+    ]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever fusing dense vector results with BM25 keyword results.
+
+    Exact tokens such as part numbers and table labels are found by BM25 even
+    when their embeddings are not close to the question, so fewer fused
+    chunks are needed than with vector search alone.
+    """
+
+    def __init__(
+        self,
+        vector_retriever: BaseRetriever,
+        bm25: BM25Index,
+        top_k: int = 2,
+        candidate_k: int = 10,
+        rrf_k: int = 60,
+        callback_manager: Optional[CallbackManager] = None,
+    ):
+        self.vector_retriever = vector_retriever
+        self.bm25 = bm25
+        self.top_k = top_k
+        self.candidate_k = candidate_k
+        self.rrf_k = rrf_k
+        super().__init__(callback_manager=callback_manager)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        dense = self.vector_retriever.retrieve(query_bundle)
+        sparse = self.bm25.search(query_bundle.query_str, self.candidate_k)
+        return reciprocal_rank_fusion([dense, sparse], k=self.rrf_k)[: self.top_k]
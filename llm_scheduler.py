@@ -0,0 +1,386 @@
+"""Process-wide rate limiting for OpenAI requests.
+
+Every OpenAI client in the process sends through a ``ScheduledTransport``,
+so the PMI extractor and the llama_index LLM and embeddings share the token
+and request budgets of each model. Waiting requests are served by priority
+lane, then in arrival order, and identical non-streaming requests in flight
+at the same time are sent once.
+"""
+
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+
+# Priority lanes; lower is served first
+INTERACTIVE = 0
+BATCH = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Budgets of the OpenAI account tier per model, as (tokens, requests) per
+# minute, matched by the longest prefix of the model name
+MODEL_LIMITS = {
+    "gpt-4o": (30000, 500),
+    "gpt-4o-mini": (200000, 500),
+    "gpt-3.5-turbo": (200000, 500),
+    "text-embedding-": (1000000, 3000),
+}
+# Per-model overrides as JSON, e.g. {"gpt-4o": [450000, 5000]}
+MODEL_LIMITS.update(
+    {
+        prefix: tuple(limits)
+        for prefix, limits in json.loads(
+            os.environ.get("OPENAI_MODEL_LIMITS", "{}")
+        ).items()
+    }
+)
+# Budgets of models not listed above; override per deployment
+TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", 30000))
+REQUESTS_PER_MINUTE = int(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", 500))
+
+# Reserved for the completion when a request does not cap its output
+DEFAULT_COMPLETION_TOKENS = 1024
+
+# Pause for a model's requests after a 429 without a Retry-After header
+RATE_LIMIT_PAUSE_SECONDS = 5.0
+
+# Response headers that no longer apply once the body has been read
+_STALE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+_lane = contextvars.ContextVar("llm_lane", default=None)
+
+
+@contextmanager
+def lane(priority: int):
+    """Send the OpenAI requests made inside this block in the given lane."""
+    token = _lane.set(priority)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class _ModelBudget:
+    """Token and request buckets, waiting queue and 429 pause of one model."""
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.requests = float(requests_per_minute)
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = []
+
+    def refill(self, now: float):
+        elapsed = now - self.refilled
+        self.refilled = now
+        self.tokens = min(
+            self.tokens_per_minute,
+            self.tokens + elapsed * self.tokens_per_minute / 60,
+        )
+        self.requests = min(
+            self.requests_per_minute,
+            self.requests + elapsed * self.requests_per_minute / 60,
+        )
+
+    def delay(self, tokens: int, now: float) -> float:
+        """Seconds until a request of this size fits both budgets."""
+        return max(
+            self.paused_until - now,
+            (tokens - self.tokens) * 60 / self.tokens_per_minute,
+            (1 - self.requests) * 60 / self.requests_per_minute,
+            0.0,
+        )
+
+
+class RateLimitScheduler:
+    """Token buckets for tokens and requests per minute, shared by all threads.
+
+    Each model has its own buckets, waiting queue and 429 pause, sized by
+    the longest matching prefix in model_limits and by the default budgets
+    otherwise. ``acquire`` blocks until the request fits its model's budgets
+    and every waiting request for that model of a higher lane, or of the
+    same lane but older, has gone. Token charges are corrected with
+    ``settle`` once the real usage is known.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        requests_per_minute: int,
+        model_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+    ):
+        self.default_limits = (tokens_per_minute, requests_per_minute)
+        self.model_limits = dict(model_limits or {})
+        self._budgets: Dict[str, _ModelBudget] = {}
+        self._cond = threading.Condition()
+        self._order = itertools.count()
+        self._in_flight = {}
+        self.running = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.sent = {name: 0 for name in LANE_NAMES.values()}
+        self.wait_seconds = {name: 0.0 for name in LANE_NAMES.values()}
+        self.max_wait_seconds = 0.0
+
+    def limits(self, model: str) -> Tuple[int, int]:
+        """Return (tokens, requests) per minute for a model."""
+        prefixes = [prefix for prefix in self.model_limits if model.startswith(prefix)]
+        if not prefixes:
+            return self.default_limits
+        return self.model_limits[max(prefixes, key=len)]
+
+    def _budget(self, model: str) -> _ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            budget = self._budgets[model] = _ModelBudget(*self.limits(model))
+        return budget
+
+    def acquire(self, tokens: int, priority: int = BATCH, model: str = "") -> int:
+        """Block until the request may be sent; return the tokens charged."""
+        entry = (priority, next(self._order))
+        start = time.monotonic()
+        with self._cond:
+            budget = self._budget(model)
+            # A request larger than the whole budget would otherwise wait forever
+            tokens = min(tokens, budget.tokens_per_minute)
+            heapq.heappush(budget.waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    budget.refill(now)
+                    delay = None
+                    if budget.waiting[0] == entry:
+                        delay = budget.delay(tokens, now)
+                        if delay <= 0:
+                            break
+                    self._cond.wait(delay)
+                heapq.heappop(budget.waiting)
+            except BaseException:
+                budget.waiting.remove(entry)
+                heapq.heapify(budget.waiting)
+                raise
+            finally:
+                self._cond.notify_all()
+
+            budget.tokens -= tokens
+            budget.requests -= 1
+            waited = time.monotonic() - start
+            name = LANE_NAMES.get(priority, str(priority))
+            self.sent[name] = self.sent.get(name, 0) + 1
+            self.wait_seconds[name] = self.wait_seconds.get(name, 0.0) + waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return tokens
+
+    @contextmanager
+    def request(self, tokens: int, priority: int = BATCH, model: str = ""):
+        """Hold a scheduled slot for one request; yield the tokens charged."""
+        charged = self.acquire(tokens, priority, model)
+        with self._cond:
+            self.running += 1
+        try:
+            yield charged
+        finally:
+            with self._cond:
+                self.running -= 1
+
+    def settle(self, charged: int, actual: int, model: str = ""):
+        """Correct a model's token budget once a request's real usage is known.
+
+        charged is what ``acquire`` deducted, which for requests larger than
+        the budget is less than their estimate.
+        """
+        with self._cond:
+            budget = self._budget(model)
+            budget.tokens = min(
+                budget.tokens_per_minute, budget.tokens + charged - actual
+            )
+            self._cond.notify_all()
+
+    def pause(self, seconds: float, model: str = ""):
+        """Hold back a model's requests for a while, e.g. after a 429."""
+        with self._cond:
+            self.rate_limited += 1
+            budget = self._budget(model)
+            budget.paused_until = max(budget.paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def coalesce(self, key: str, call: Callable):
+        """Run call once for all concurrent callers with the same key."""
+        with self._cond:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = call()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._cond:
+                del self._in_flight[key]
+
+    def metrics(self) -> dict:
+        """Return queue depth per lane, budgets per model and counters."""
+        with self._cond:
+            now = time.monotonic()
+            queued = {name: 0 for name in LANE_NAMES.values()}
+            budgets = {}
+            for model, budget in self._budgets.items():
+                budget.refill(now)
+                for priority, _ in budget.waiting:
+                    name = LANE_NAMES.get(priority, str(priority))
+                    queued[name] = queued.get(name, 0) + 1
+                budgets[model or "unknown"] = {
+                    "tokens_available": int(budget.tokens),
+                    "requests_available": int(budget.requests),
+                }
+            return {
+                "queued": queued,
+                "running": self.running,
+                "in_flight_unique": len(self._in_flight),
+                "sent": dict(self.sent),
+                "coalesced": self.coalesced,
+                "rate_limited": self.rate_limited,
+                "avg_wait_ms": {
+                    name: round(1000 * total / self.sent[name], 1)
+                    for name, total in self.wait_seconds.items()
+                    if self.sent.get(name)
+                },
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 1),
+                "budgets": budgets,
+            }
+
+
+scheduler = RateLimitScheduler(TOKENS_PER_MINUTE, REQUESTS_PER_MINUTE, MODEL_LIMITS)
+
+
+def estimate_request_tokens(path: str, payload: dict, body: bytes) -> int:
+    """Rough token cost of a request: its prompt plus the completion it allows."""
+    prompt_tokens = len(body) // 4 + 1
+    if path.endswith("/embeddings"):
+        return prompt_tokens
+    completion_tokens = (
+        payload.get("max_output_tokens")
+        or payload.get("max_completion_tokens")
+        or payload.get("max_tokens")
+        or DEFAULT_COMPLETION_TOKENS
+    )
+    return prompt_tokens + completion_tokens
+
+
+def _retry_after(response: httpx.Response) -> float:
+    try:
+        if "retry-after-ms" in response.headers:
+            return float(response.headers["retry-after-ms"]) / 1000
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return RATE_LIMIT_PAUSE_SECONDS
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    """httpx transport sending every request through a RateLimitScheduler.
+
+    The lane is taken from the enclosing ``lane`` block, else ``priority``.
+    Streaming responses are passed through as they arrive; other responses
+    are read in full so identical concurrent requests can share them.
+    """
+
+    def __init__(
+        self,
+        scheduler: RateLimitScheduler,
+        priority: int = BATCH,
+        inner: Optional[httpx.BaseTransport] = None,
+    ):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.inner = inner or httpx.HTTPTransport()
+
+    def _observe(self, response: httpx.Response, model: str):
+        if response.status_code == 429:
+            self.scheduler.pause(_retry_after(response), model)
+
+    def _send_buffered(
+        self, request: httpx.Request, tokens: int, priority: int, model: str
+    ) -> Tuple[int, list, bytes]:
+        with self.scheduler.request(tokens, priority, model) as charged:
+            response = self.inner.handle_request(request)
+            try:
+                content = response.read()
+            finally:
+                response.close()
+        self._observe(response, model)
+
+        try:
+            usage = json.loads(content).get("usage") or {}
+            self.scheduler.settle(charged, int(usage["total_tokens"]), model)
+        except (ValueError, AttributeError, KeyError, TypeError):
+            pass
+        headers = [
+            (name, value)
+            for name, value in response.headers.items()
+            if name.lower() not in _STALE_HEADERS
+        ]
+        return response.status_code, headers, content
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = {}
+        if not isinstance(payload, dict):
+            payload = {}
+        lane_priority = _lane.get()
+        priority = self.priority if lane_priority is None else lane_priority
+        tokens = estimate_request_tokens(request.url.path, payload, body)
+        model = str(payload.get("model") or "")
+
+        if payload.get("stream"):
+            with self.scheduler.request(tokens, priority, model):
+                response = self.inner.handle_request(request)
+            self._observe(response, model)
+            return response
+
+        # The API key is part of the key so different accounts never share
+        key = hashlib.sha256(
+            b"\0".join(
+                [
+                    request.method.encode(),
+                    str(request.url).encode(),
+                    request.headers.get("authorization", "").encode(),
+                    body,
+                ]
+            )
+        ).hexdigest()
+        status, headers, content = self.scheduler.coalesce(
+            key, lambda: self._send_buffered(request, tokens, priority, model)
+        )
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+    def close(self):
+        self.inner.close()
+
+
+def scheduled_http_client(priority: int = BATCH) -> httpx.Client:
+    """Return an httpx client for OpenAI SDK clients, scheduled in a lane."""
+    return httpx.Client(transport=ScheduledTransport(scheduler, priority))
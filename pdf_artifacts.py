@@ -0,0 +1,155 @@
+import io
+import json
+import os
+import struct
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pdfplumber
+from PIL import Image
+
+from disk_cache import CACHE_DIR, DiskCache
+from word_store import PageWords
+
+ARTIFACT_CACHE_PATH = os.path.join(CACHE_DIR, "pdf_artifacts.sqlite")
+ARTIFACT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Bump when the stored layout changes so old entries are never misread
+ARTIFACT_FORMAT = 2
+
+
+class ParsedPdf(NamedTuple):
+    """Words and text lines of every page of a PDF."""
+
+    page_words: List[PageWords]
+    page_lines: List[List[str]]
+
+
+def encode_parsed(parsed: ParsedPdf) -> bytes:
+    """Pack the pages column-wise behind a JSON header.
+
+    The header holds the text lines, the word count and the distinct word
+    texts of each page. The word boxes of all pages follow as one
+    (words, 4) float32 array, then the text codes as one int32 array.
+    """
+    pages = parsed.page_words
+    header = json.dumps(
+        {
+            "lines": parsed.page_lines,
+            "counts": [len(page) for page in pages],
+            "vocabs": [page.vocab for page in pages],
+        }
+    ).encode("utf-8")
+    boxes = np.concatenate([page.boxes for page in pages] or [np.empty((0, 4))])
+    codes = np.concatenate([page.codes for page in pages] or [np.empty(0)])
+    return b"".join(
+        [
+            struct.pack("<I", len(header)),
+            header,
+            boxes.astype("<f4").tobytes(),
+            codes.astype("<i4").tobytes(),
+        ]
+    )
+
+
+def decode_parsed(blob: bytes) -> ParsedPdf:
+    """Inverse of encode_parsed."""
+    (header_size,) = struct.unpack_from("<I", blob)
+    header = json.loads(blob[4 : 4 + header_size])
+    total = sum(header["counts"])
+    offset = 4 + header_size
+    boxes = np.frombuffer(blob, "<f4", count=total * 4, offset=offset)
+    codes = np.frombuffer(blob, "<i4", count=total, offset=offset + total * 16)
+    boxes = boxes.reshape(-1, 4)
+
+    page_words = []
+    start = 0
+    for count, vocab in zip(header["counts"], header["vocabs"]):
+        stop = start + count
+        page_words.append(PageWords(vocab, codes[start:stop], boxes[start:stop]))
+        start = stop
+    return ParsedPdf(page_words, header["lines"])
+
+
+def parse_pdf(pdf_bytes: bytes) -> ParsedPdf:
+    """Extract the words and text lines of every page."""
+    page_words, page_lines = [], []
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages:
+            page_words.append(PageWords.from_dicts(page.extract_words()))
+            text = page.extract_text()
+            page_lines.append(text.split("\n") if text else [])
+    return ParsedPdf(page_words, page_lines)
+
+
+def render_pngs(
+    pdf_bytes: bytes, page_numbers: Sequence[int], resolution: int
+) -> List[bytes]:
+    """Rasterize several pages to PNG bytes, opening the PDF only once."""
+    pngs = []
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page_number in page_numbers:
+            page_image = pdf.pages[page_number].to_image(resolution=resolution)
+            buffer = io.BytesIO()
+            page_image.original.convert("RGB").save(buffer, format="PNG")
+            pngs.append(buffer.getvalue())
+    return pngs
+
+
+class PdfArtifactCache:
+    """Parsed words, text lines and rendered pages, keyed by PDF content hash.
+
+    Artifacts live in a ``DiskCache``, so they survive reruns and restarts
+    and the least recently viewed drawings are evicted first. Each method
+    returns its artifact and whether it came from the cache.
+    """
+
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+
+    def parsed(self, pdf_hash: str, pdf_bytes: bytes) -> Tuple[ParsedPdf, bool]:
+        key = f"v{ARTIFACT_FORMAT}:{pdf_hash}:parsed"
+        blob = self.cache.get(key)
+        if blob is not None:
+            return decode_parsed(blob), True
+
+        blob = encode_parsed(parse_pdf(pdf_bytes))
+        self.cache.set(key, blob)
+        # Decoded either way, so coordinates are identical on every view
+        return decode_parsed(blob), False
+
+    def page_image(
+        self, pdf_hash: str, page_number: int, resolution: int, pdf_bytes: bytes
+    ) -> Tuple[Image.Image, bool]:
+        images, hits = self.page_images(pdf_hash, [page_number], resolution, pdf_bytes)
+        return images[0], hits[0]
+
+    def page_images(
+        self,
+        pdf_hash: str,
+        page_numbers: Sequence[int],
+        resolution: int,
+        pdf_bytes: bytes,
+    ) -> Tuple[List[Image.Image], List[bool]]:
+        """Like page_image for several pages; the misses share one PDF open."""
+        keys = [
+            f"v{ARTIFACT_FORMAT}:{pdf_hash}:page:{page_number}:{resolution}"
+            for page_number in page_numbers
+        ]
+        pngs = [self.cache.get(key) for key in keys]
+        hits = [png is not None for png in pngs]
+        missing = [i for i, hit in enumerate(hits) if not hit]
+        if missing:
+            rendered = render_pngs(
+                pdf_bytes, [page_numbers[i] for i in missing], resolution
+            )
+            for i, png in zip(missing, rendered):
+                self.cache.set(keys[i], png)
+                pngs[i] = png
+        images = [Image.open(io.BytesIO(png)).convert("RGB") for png in pngs]
+        return images, hits
+
+
+def default_artifact_cache() -> PdfArtifactCache:
+    """Return an artifact cache over the shared on-disk store."""
+    return PdfArtifactCache(DiskCache(ARTIFACT_CACHE_PATH, ARTIFACT_CACHE_MAX_BYTES))
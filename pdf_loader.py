@@ -0,0 +1,129 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from llama_index.core import Document
+from pypdf import PdfReader
+
+# Pages parsed per worker task; each task re-opens the PDF, so very small
+# ranges spend most of their time parsing the document structure
+PAGES_PER_TASK = 8
+
+
+def count_pages(path: str) -> int:
+    """Return the number of pages in a PDF."""
+    return len(PdfReader(path).pages)
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract the text of pages [start, stop) of a PDF in a worker process."""
+    reader = PdfReader(path)
+    return [
+        (number, reader.pages[number].extract_text() or "")
+        for number in range(start, stop)
+    ]
+
+
+def _page_document(path: str, number: int, text: str) -> Document:
+    return Document(
+        text=text,
+        id_=f"{path}_part_{number}",
+        metadata={
+            "page_label": str(number + 1),
+            "file_name": os.path.basename(path),
+            "file_path": path,
+        },
+        excluded_embed_metadata_keys=["file_name"],
+        excluded_llm_metadata_keys=["file_name"],
+    )
+
+
+def _text_document(path: str) -> Document:
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    return Document(
+        text=text,
+        id_=path,
+        metadata={"file_name": os.path.basename(path), "file_path": path},
+        excluded_embed_metadata_keys=["file_name"],
+        excluded_llm_metadata_keys=["file_name"],
+    )
+
+
+def iter_documents(
+    paths: Sequence[str],
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    on_error: Optional[Callable[[str, Exception], None]] = None,
+) -> Iterator[List[Document]]:
+    """Parse files into per-page documents in a process pool.
+
+    PDFs are split into page ranges that are parsed in parallel, and each
+    range is yielded as soon as it completes so the caller can embed it while
+    other pages are still being parsed. Pages without text are skipped.
+    ``progress`` is called with (pages done, total pages) after each range.
+
+    A file that cannot be read is reported once to ``on_error`` with its path
+    and the exception, and none of its remaining ranges are yielded; ranges
+    yielded before the failure are the caller's to discard.
+    """
+    pdf_paths = [path for path in paths if path.lower().endswith(".pdf")]
+    other_paths = [path for path in paths if not path.lower().endswith(".pdf")]
+
+    failed = set()
+
+    def fail(path: str, error: Exception):
+        failed.add(path)
+        if on_error:
+            on_error(path, error)
+
+    tasks = []
+    for path in pdf_paths:
+        try:
+            pages = count_pages(path)
+        except Exception as error:
+            fail(path, error)
+            continue
+        for start in range(0, pages, PAGES_PER_TASK):
+            tasks.append((path, start, min(start + PAGES_PER_TASK, pages)))
+
+    total = sum(stop - start for _, start, stop in tasks) + len(other_paths)
+    done = 0
+
+    for path in other_paths:
+        done += 1
+        try:
+            docs = [_text_document(path)]
+        except OSError as error:
+            fail(path, error)
+            docs = []
+        yield docs
+        if progress:
+            progress(done, total)
+
+    if not tasks:
+        return
+
+    # Never start more worker processes than there are tasks
+    workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(extract_page_range, path, start, stop): (path, start, stop)
+            for path, start, stop in tasks
+        }
+        for future in as_completed(futures):
+            path, start, stop = futures[future]
+            done += stop - start
+            try:
+                pages = future.result()
+            except Exception as error:
+                if path not in failed:
+                    fail(path, error)
+                pages = []
+            yield [
+                _page_document(path, number, text)
+                for number, text in pages
+                if path not in failed and text.strip()
+            ]
+            if progress:
+                progress(done, total)
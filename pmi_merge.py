@@ -0,0 +1,191 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from extraction_config import FIELD_NAMES, FIELDS
+
+# Shortest quote of a regex match that counts as accounting for it
+MIN_QUOTE_CHARS = 4
+
+# Regex pattern labels that feed a differently named schema field
+REGEX_FIELD_ALIASES = {
+    field.pattern_label: field.name for field in FIELDS if field.pattern_label
+}
+
+UNIT_ALIASES = [
+    (re.compile(r'(?<=\d)\s*(?:"|inches|inch|in\.?)(?![a-z])', re.I), " in"),
+    (re.compile(r"(?<=\d)\s*(?:millimet(?:er|re)s?|mm)(?![a-z])", re.I), " mm"),
+    (re.compile(r"(?<=\d)\s*(?:microns?|µm|μm|um)(?![a-z])", re.I), " μm"),
+]
+DIAMETER_SYMBOL = re.compile(r"(?:Ø|ø|⌀|\bDIA(?:METER)?\b\.?)\s*", re.I)
+METRIC_THREAD = re.compile(
+    r"\bM\s*(\d+(?:\.\d+)?)(?:\s*[x×]\s*(\d+(?:\.\d+)?))?(?![\d.])", re.I
+)
+UNIFIED_THREAD = re.compile(
+    r"(#?\d+(?:/\d+)?)\s*\"?\s*-\s*(\d+)\s*-?\s*(UNC|UNF|UNEF)(?:\s*-?\s*(\d[AB]))?",
+    re.I,
+)
+STANDARD = re.compile(r"\b(AWS|ASME|ASTM|DIN|SAES|AMSS|ISO)[\s-]*(?=[A-Z0-9])", re.I)
+
+
+def _clean(value: str) -> str:
+    return " ".join(value.split()).strip(" .,;:")
+
+
+def _units(value: str) -> str:
+    for pattern, unit in UNIT_ALIASES:
+        value = pattern.sub(unit, value)
+    return value
+
+
+def canonical_thread(value: str) -> str:
+    """Spell metric and unified thread callouts one way: M8x1.25, 1/4-20 UNC-2B."""
+
+    def metric(match):
+        pitch = f"x{match.group(2)}" if match.group(2) else ""
+        return f"M{match.group(1)}{pitch}"
+
+    def unified(match):
+        size, tpi, series, fit = match.groups()
+        suffix = f"-{fit.upper()}" if fit else ""
+        return f"{size}-{tpi} {series.upper()}{suffix}"
+
+    value = UNIFIED_THREAD.sub(unified, _clean(value))
+    return METRIC_THREAD.sub(metric, value)
+
+
+def canonical_diameter(value: str) -> str:
+    """Use one diameter symbol and unit spelling: "Ø 12.5MM" -> "⌀12.5 mm"."""
+    return _units(DIAMETER_SYMBOL.sub("⌀", _clean(value)))
+
+
+def canonical_standard(value: str) -> str:
+    """Uppercase a standard and separate body from number: "astm-a36" -> "ASTM A36"."""
+    return STANDARD.sub(lambda m: f"{m.group(1)} ", _clean(value).upper())
+
+
+CANONICALIZERS = {
+    "threads": canonical_thread,
+    "diameters": canonical_diameter,
+    "standards": canonical_standard,
+}
+
+
+def canonical_value(field_name: str, value: str) -> str:
+    """Return the standardized spelling of a value for its field."""
+    canonicalize = CANONICALIZERS.get(field_name)
+    if canonicalize:
+        return canonicalize(value)
+    return _units(_clean(value))
+
+
+def _key(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def empty_fields() -> dict:
+    """Return a merged extraction with every field empty."""
+    return {
+        field_name: {"values": [], "notes": "", "sources": []}
+        for field_name in FIELD_NAMES
+    }
+
+
+def _accounted_for(full_match: str, field_name: str, evidence: List[str]) -> bool:
+    """Whether a regex match shows up in the values or sources of its field."""
+    match_key = _key(full_match)
+    canonical_key = _key(canonical_value(field_name, full_match))
+    evidence_text = "\n".join(evidence)
+    if match_key in evidence_text or (canonical_key and canonical_key in evidence_text):
+        return True
+    # Long matches, such as whole weld lines, are often quoted only in part
+    return any(len(item) >= MIN_QUOTE_CHARS and item in match_key for item in evidence)
+
+
+def merge_locally(
+    passes: List[dict], regex_extracted: Dict[str, Dict[str, set]]
+) -> Tuple[dict, List[str]]:
+    """Deterministically merge LLM pass results and regex hits.
+
+    Values are canonicalized per field and deduplicated, distinct notes are
+    joined and sources are deduplicated by (value, text). Returns the merged
+    fields and a list of conflicts: a source text that two passes read as
+    disjoint values, or a regex match that no pass accounted for in the
+    values or sources of the match's own field. regex_extracted is as
+    returned by regex_pass. When there are
+    conflicts the caller should fall back to the LLM merge. Passes that
+    were skipped are given as empty dicts. Every field is always present,
+    empty if no pass ran or none succeeded.
+    """
+    usable = [data for data in passes if data and "error" not in data]
+    if not usable and any(data and "error" in data for data in passes):
+        return empty_fields(), ["no LLM pass succeeded"]
+
+    merged = {}
+    conflicts = []
+    evidence = {field_name: [] for field_name in FIELD_NAMES}
+    for field_name in FIELD_NAMES:
+        values, value_keys = [], set()
+        notes = []
+        sources, source_keys = [], set()
+        readings = {}
+        for pass_number, data in enumerate(usable):
+            field_data = data.get(field_name) or {}
+            for value in field_data.get("values", []):
+                value = canonical_value(field_name, value)
+                if value and _key(value) not in value_keys:
+                    value_keys.add(_key(value))
+                    values.append(value)
+                    evidence[field_name].append(_key(value))
+            note = field_data.get("notes", "").strip()
+            if note and note not in notes:
+                notes.append(note)
+            for source in field_data.get("sources", []):
+                value = canonical_value(field_name, source["value"])
+                text_key = _key(source["text"])
+                evidence[field_name].append(text_key)
+                by_pass = readings.setdefault(text_key, {})
+                by_pass.setdefault(pass_number, set()).add(_key(value))
+                if (_key(value), text_key) not in source_keys:
+                    source_keys.add((_key(value), text_key))
+                    sources.append({**source, "value": value})
+
+        # Passes disagree when they read the same text as disjoint values
+        for text_key, by_pass in readings.items():
+            read_as = list(by_pass.values())
+            if any(a.isdisjoint(b) for a in read_as for b in read_as):
+                conflicts.append(
+                    f"{field_name}: '{text_key}' read as "
+                    f"{sorted(set().union(*read_as))}"
+                )
+        merged[field_name] = {
+            "values": values,
+            "notes": "\n".join(notes),
+            "sources": sources,
+        }
+
+    for label, hits in regex_extracted.items():
+        field_name = REGEX_FIELD_ALIASES.get(label, label)
+        for full_match in sorted(set().union(*hits.values())):
+            if full_match and not _accounted_for(
+                full_match, field_name, evidence[field_name]
+            ):
+                conflicts.append(
+                    f"{field_name}: regex hit '{full_match}' not in any pass"
+                )
+
+    return merged, conflicts
+
+
+def conflicted_fields(conflicts: List[str]) -> Optional[List[str]]:
+    """Return the fields merge_locally's conflicts are about, in schema order.
+
+    Returns None when a conflict is not about a single field, such as every
+    pass having failed, so the whole extraction needs merging.
+    """
+    names = set()
+    for conflict in conflicts:
+        field_name, separator, _ = conflict.partition(":")
+        if not separator or field_name not in FIELD_NAMES:
+            return None
+        names.add(field_name)
+    return [field_name for field_name in FIELD_NAMES if field_name in names]
@@ -0,0 +1,707 @@
+"""Streamlit-free PMI extraction pipeline and batch CLI.
+
+Runs regex -> LLM passes -> merge -> classify over manufacturing drawings.
+The Streamlit app uses the same functions for single uploads.
+
+Usage: python pmi_pipeline.py DIR_OR_GLOB [...] --output-dir results [--jsonl all.jsonl]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import openai
+import pdfplumber
+from dotenv import load_dotenv
+from PIL import ImageDraw
+
+from disk_cache import CACHE_DIR, DiskCache
+from extraction_config import (
+    CLASSIFICATION_MAPPING,
+    FIELD_NAMES,
+    compiled_schema,
+    patterns,
+    route_fields,
+)
+from llm_scheduler import BATCH, scheduled_http_client
+from pmi_merge import REGEX_FIELD_ALIASES, conflicted_fields, merge_locally
+from tracing import Span, Trace
+
+# --- LLM call settings ---
+LLM_MODEL = "gpt-4o-2024-08-06"
+LLM_TIMEOUT_SECONDS = 120
+LLM_MAX_ATTEMPTS = 3
+LLM_BACKOFF_SECONDS = 2.0
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+# --- Response cache ---
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.sqlite")
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Lines containing any of these go to the notes-only pass
+NOTE_KEYWORDS = ["NOTE", "WELD", "COATING", "SURFACE"]
+
+# Largest document-pass prompt, in estimated tokens, before it is chunked
+CHUNK_TOKEN_BUDGET = 8000
+MAX_PARALLEL_PASSES = 8
+
+
+# --- Pass plans ---
+class PassPlan(NamedTuple):
+    """One LLM pass of a plan: the text it reads and the fields it extracts."""
+
+    name: str
+    # "document" passes read each page-aligned chunk, "notes" passes the note lines
+    source: str
+    # Fields always extracted; None extracts every field
+    fields: Optional[Tuple[str, ...]] = None
+    # Also extract the fields whose regex or keywords match the text
+    routed: bool = False
+
+
+PASS_PLANS = {
+    # Every pass fills every field
+    "full": [
+        PassPlan("doc_extraction", "document"),
+        PassPlan("notes_extraction", "notes"),
+    ],
+    # Each text fills only the fields it shows evidence of. Cost drivers
+    # have no pattern to route on, so the document passes always fill them.
+    "routed": [
+        PassPlan("doc_extraction", "document", ("cost_drivers",), routed=True),
+        PassPlan("notes_extraction", "notes", (), routed=True),
+    ],
+}
+DEFAULT_PASS_PLAN = "routed"
+
+
+def pass_fields(plan: PassPlan, text: str) -> List[str]:
+    """Return the fields a pass extracts from text; empty means skip the pass."""
+    if plan.fields is None:
+        return list(FIELD_NAMES)
+    if plan.routed:
+        return route_fields(text, plan.fields)
+    return list(plan.fields)
+
+
+# --- LLM passes ---
+SYSTEM_PROMPT = """Extract ALL quote-relevant manufacturing data. Follow these rules:
+1. Each field MUST contain:
+   - An array of ALL standardized values found (keep these concise and filterable)
+   - A detailed notes field that provides comprehensive context
+   - A sources array containing the evidence for each extraction
+   - For example, rather than 6-12in pipe, extract 6 inch pipe, 8 inch pipe, 10 inch pipe, 12 inch pipe
+   - Specify whatever the diameter is for. E.g. 6 inch pipe, not just 6 inch
+2. Values should be normalized and standardized but MUST be comprehensive:
+   - Extract ALL instances of each type of value, not just a representative sample
+   - Include ALL variations and instances, even if they seem similar
+   - Remove unnecessary details and context from values
+   - Split complex requirements into separate values
+   - Use standard units and formats
+   - Use uppercase for standards and specifications
+3. Notes field should be comprehensive and include:
+   - Full context and requirements
+   - Application-specific details
+   - Location or part-specific information
+   - Relationships between different values
+   - Special instructions or considerations
+   - Any caveats or conditions
+4. Sources must include for EVERY value:
+   - The exact text snippet from the document that supports the extraction
+   - Which value it supports
+   - A few words of surrounding context
+5. Example format showing multiple similar values:
+   "threads": {
+     "values": ["M6x1.0", "M6x1.0", "M8x1.25", "M8x1.25", "1/4-20 UNC"],
+     "notes": "Multiple M6 and M8 threaded holes throughout. M6 holes on front face, M8 on back face, 1/4-20 UNC on mounting bracket.",
+     "sources": [
+       {
+         "text": "M6x1.0 threaded hole",
+         "value": "M6x1.0",
+         "context": "Front face: M6x1.0 threaded hole"
+       },
+       {
+         "text": "M6x1.0 thread",
+         "value": "M6x1.0",
+         "context": "Second M6x1.0 thread on front face"
+       },
+       {
+         "text": "M8x1.25",
+         "value": "M8x1.25",
+         "context": "Back face: 2x M8x1.25"
+       }
+     ]
+   }
+   
+IMPORTANT: Do not summarize or reduce multiple instances to a single value. Extract and list ALL instances, even if they are identical."""
+
+MERGE_SYSTEM_PROMPT = (
+    "Return the most complete and accurate merged manufacturing information in JSON. "
+    "Ensure values are standardized and normalized, with contextual details in notes."
+)
+
+
+def with_retries(call, attempts=LLM_MAX_ATTEMPTS, backoff=LLM_BACKOFF_SECONDS):
+    """Run an API call, retrying transient failures with exponential backoff."""
+    for attempt in range(attempts):
+        try:
+            return call()
+        except RETRYABLE_ERRORS:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff * 2**attempt)
+
+
+class Extractor:
+    """Structured LLM calls with retries and an on-disk response cache."""
+
+    def __init__(self, client: openai.OpenAI, cache: DiskCache):
+        # Retries are handled by with_retries so the backoff is under our control
+        self.client = client.with_options(timeout=LLM_TIMEOUT_SECONDS, max_retries=0)
+        self.cache = cache
+
+    def structured_call(
+        self,
+        system_prompt: str,
+        user_text: str,
+        name: str,
+        span: Optional[Span] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict:
+        """Return the schema-constrained JSON response, served from disk when seen before.
+
+        The response schema covers only fields, if given, and every field
+        otherwise. Cache hits and token usage are recorded on span, if given.
+        """
+        schema = compiled_schema(fields)
+        payload = json.dumps([LLM_MODEL, system_prompt, user_text, name, schema.hash])
+        key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        cached = self.cache.get(key)
+        if span:
+            span.set(cache_hit=cached is not None)
+        if cached is not None:
+            return json.loads(cached)
+
+        response = with_retries(
+            lambda: self.client.responses.create(
+                model=LLM_MODEL,
+                input=[
+                    {
+                        "role": "system",
+                        "content": system_prompt,
+                    },
+                    {"role": "user", "content": user_text},
+                ],
+                text={
+                    "format": {
+                        "type": "json_schema",
+                        "name": name,
+                        "schema": schema.schema,
+                        "strict": True,
+                    }
+                },
+            )
+        )
+        if span and response.usage:
+            span.set(
+                input_tokens=response.usage.input_tokens,
+                output_tokens=response.usage.output_tokens,
+            )
+        result = json.loads(response.output_text)
+        self.cache.set(key, response.output_text.encode("utf-8"))
+        return result
+
+    def llm_pass(
+        self,
+        prompt_text: str,
+        name: str,
+        trace: Optional[Trace] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict:
+        """Run one structured extraction pass over a block of drawing text.
+
+        Only fields are extracted, if given, and every field otherwise.
+        """
+        trace = trace or Trace(name)
+        field_count = len(fields) if fields is not None else len(FIELD_NAMES)
+        with trace.span("llm_pass", pass_name=name, fields=field_count) as span:
+            try:
+                return self.structured_call(
+                    SYSTEM_PROMPT, prompt_text, name, span, fields
+                )
+            except Exception as e:
+                span.set(error=str(e))
+                return {"error": str(e)}
+
+
+def default_extractor(
+    api_key: Optional[str] = None, priority: int = BATCH
+) -> Extractor:
+    """Return an Extractor using the shared response cache and request scheduler."""
+    return Extractor(
+        openai.OpenAI(api_key=api_key, http_client=scheduled_http_client(priority)),
+        DiskCache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES),
+    )
+
+
+# --- Pipeline steps ---
+def assemble_text(page_lines: List[List[str]]) -> Tuple[str, str, List[str]]:
+    """Return the full text, the note lines and the per-page text from page lines."""
+    all_text = []
+    note_lines = []
+    pages = []
+    for lines in page_lines:
+        if lines:
+            all_text.extend(lines)
+            pages.append("\n".join(lines))
+            for line in lines:
+                if any(k in line.upper() for k in NOTE_KEYWORDS):
+                    note_lines.append(line.strip())
+    return "\n".join(all_text), "\n".join(note_lines), pages
+
+
+def read_pdf_text(pdf) -> Tuple[str, str, List[str]]:
+    """Return the full text, the note lines and the per-page text of a PDF."""
+    page_lines = []
+    for page in pdf.pages:
+        text = page.extract_text()
+        page_lines.append(text.split("\n") if text else [])
+    return assemble_text(page_lines)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English-like text, about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def chunk_pages(pages: List[str], budget: int = CHUNK_TOKEN_BUDGET) -> List[str]:
+    """Pack whole pages into chunks of at most budget tokens.
+
+    Pages over the budget are split on line boundaries. Chunks are joined the
+    same way as the full text, so a drawing that fits in one chunk sends
+    exactly the text it always did.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for page in pages:
+        units = [page] if estimate_tokens(page) <= budget else page.split("\n")
+        for unit in units:
+            tokens = estimate_tokens(unit)
+            if current and current_tokens + tokens > budget:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def reduce_extractions(results: List[dict]) -> dict:
+    """Combine per-chunk extractions, in chunk order, into one extraction.
+
+    Values are concatenated, distinct notes are joined and sources are
+    deduplicated by (text, value, context). Errors from individual chunks are
+    kept under "chunk_errors".
+    """
+    succeeded = [result for result in results if "error" not in result]
+    errors = [result["error"] for result in results if "error" in result]
+    if not succeeded:
+        return {"error": "; ".join(errors)}
+
+    reduced = {}
+    for field_name in FIELD_NAMES:
+        values, notes, sources, seen = [], [], [], set()
+        for result in succeeded:
+            field_data = result.get(field_name)
+            if not field_data:
+                continue
+            values.extend(field_data["values"])
+            note = field_data["notes"].strip()
+            if note and note not in notes:
+                notes.append(note)
+            for source in field_data["sources"]:
+                key = (source["text"], source["value"], source["context"])
+                if key not in seen:
+                    seen.add(key)
+                    sources.append(source)
+        reduced[field_name] = {
+            "values": values,
+            "notes": "\n".join(notes),
+            "sources": sources,
+        }
+    if errors:
+        reduced["chunk_errors"] = errors
+    return reduced
+
+
+def combine_passes(results: List[dict]) -> dict:
+    """Combine the results of all passes over one source, like document chunks."""
+    if not results:
+        return {}
+    if len(results) == 1:
+        return results[0]
+    return reduce_extractions(results)
+
+
+def regex_pass(text_blob: str) -> Dict[str, Dict[str, set]]:
+    """Collect regex hits per category from the document text.
+
+    Each category maps the value findall() would give, the first group if
+    there is one, to the full matches it was taken from.
+    """
+    regex_extracted = defaultdict(dict)
+    # Each pattern's own scan; the results are grouped by category anyway
+    for label, pattern in patterns.items():
+        for match in pattern.finditer(text_blob):
+            match_text = (match.group(1) or "") if pattern.groups else match.group()
+            if match_text.upper() != "ING":
+                full_matches = regex_extracted[label].setdefault(
+                    match_text.strip(), set()
+                )
+                full_matches.add(match.group().strip())
+    return regex_extracted
+
+
+def build_merge_prompt(
+    doc_data: dict,
+    notes_data: dict,
+    regex_extracted: dict,
+    fields: Optional[Sequence[str]] = None,
+) -> str:
+    """Return the user prompt for the merge call, covering only fields if given."""
+    if fields is not None:
+        doc_data = {name: doc_data[name] for name in fields if name in doc_data}
+        notes_data = {name: notes_data[name] for name in fields if name in notes_data}
+        regex_extracted = {
+            label: hits
+            for label, hits in regex_extracted.items()
+            if REGEX_FIELD_ALIASES.get(label, label) in fields
+        }
+    # Sorted so identical inputs always produce the same cache key
+    return (
+        "Merge field-level extractions from document-wide LLM, notes-only LLM, and regex. "
+        "Return final values only, deduplicated and domain-cleaned.\n\n"
+        "Rules:\n"
+        "1. Standardize and normalize all values\n"
+        "2. Remove duplicates and similar values\n"
+        "3. Group related values that represent alternatives\n"
+        "4. Move contextual details to notes\n"
+        "5. Keep values concise and filterable\n\n"
+        f"Document LLM:\n{json.dumps(doc_data)}\n\n"
+        f"Notes LLM:\n{json.dumps(notes_data)}\n\n"
+        f"Regex:\n{json.dumps({k: sorted(v) for k, v in regex_extracted.items()})}"
+    )
+
+
+def extract_fields(
+    extractor: Extractor,
+    text_blob: str,
+    notes_blob: str,
+    pages: Optional[List[str]] = None,
+    trace: Optional[Trace] = None,
+    plan: str = DEFAULT_PASS_PLAN,
+) -> dict:
+    """Run the regex pass, the LLM passes and the merge over drawing text.
+
+    The passes come from the named entry of PASS_PLANS. Document text is
+    split into page-aligned chunks within CHUNK_TOKEN_BUDGET, so large
+    drawings stay inside the context limit, and every pass runs on every
+    chunk of its source. Each run asks only for the fields its pass
+    extracts from that chunk, and runs with no fields are skipped. All runs
+    go concurrently. Each stage is recorded as a span on trace, if given.
+    """
+    trace = trace or Trace("extract_fields")
+    with trace.span("regex_pass") as span:
+        regex_extracted = regex_pass(text_blob)
+        span.set(hits=sum(len(hits) for hits in regex_extracted.values()))
+    segments = {
+        "document": chunk_pages(pages if pages is not None else [text_blob]),
+        "notes": [notes_blob],
+    }
+    runs = [
+        (step, segment, pass_fields(step, segment))
+        for step in PASS_PLANS[plan]
+        for segment in segments[step.source]
+    ]
+    # Blank text, such as a drawing without a text layer, has nothing to extract
+    runs = [
+        (step, segment, fields)
+        for step, segment, fields in runs
+        if fields and segment.strip()
+    ]
+
+    # All passes are independent, so run them side by side
+    results = {source: [] for source in segments}
+    workers = max(1, min(len(runs), MAX_PARALLEL_PASSES))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (
+                step.source,
+                pool.submit(extractor.llm_pass, segment, step.name, trace, fields),
+            )
+            for step, segment, fields in runs
+        ]
+        for source, future in futures:
+            results[source].append(future.result())
+
+    doc_data = combine_passes(results["document"])
+    notes_data = combine_passes(results["notes"])
+
+    # The LLM merge is only needed when the passes disagree
+    with trace.span("merge") as span:
+        merged_fields, conflicts = merge_locally(
+            [doc_data, notes_data], regex_extracted
+        )
+        span.set(conflicts=len(conflicts))
+    merge_mode = "local"
+    merge_error = None
+    if conflicts:
+        # Only the conflicting fields are sent back; the rest stay merged locally
+        fields = conflicted_fields(conflicts)
+        with trace.span("llm_merge", fields=len(fields or FIELD_NAMES)) as span:
+            try:
+                resolved = extractor.structured_call(
+                    MERGE_SYSTEM_PROMPT,
+                    build_merge_prompt(doc_data, notes_data, regex_extracted, fields),
+                    "merged_fields",
+                    span,
+                    fields,
+                )
+            except Exception as e:
+                # Keep the local merge rather than lose the drawing
+                span.set(error=str(e))
+                merge_error = str(e)
+            else:
+                merged_fields = {**merged_fields, **resolved}
+                merge_mode = "llm"
+    result = {
+        "regex": {k: sorted(v) for k, v in regex_extracted.items()},
+        "notes_pass": notes_data,
+        "doc_pass": doc_data,
+        "pass_fields": [
+            {"pass": step.name, "fields": fields} for step, _, fields in runs
+        ],
+        "merged": merged_fields,
+        "merge_mode": merge_mode,
+        "merge_conflicts": conflicts,
+    }
+    if merge_error:
+        result["merge_error"] = merge_error
+        passes = [doc_data, notes_data]
+        if not any(data and "error" not in data for data in passes):
+            # Nothing was extracted at all, so the drawing has failed
+            pass_errors = "; ".join(data["error"] for data in passes if data)
+            result["error"] = (
+                f"LLM passes failed: {pass_errors}; LLM merge failed: {merge_error}"
+            )
+    return result
+
+
+def get_classifications(field_name: str, values: List[str]) -> List[str]:
+    """Get classifications for a field's values."""
+    if field_name not in CLASSIFICATION_MAPPING:
+        return []
+
+    # Classifiers take every value at once and return labels per value
+    labels = CLASSIFICATION_MAPPING[field_name](list(values))
+    return sorted({label for value_labels in labels for label in value_labels})
+
+
+def classify_fields(merged_fields: dict) -> Dict[str, List[str]]:
+    """Classify the merged values of every field that has a classifier."""
+    return {
+        field_name: get_classifications(field_name, merged_fields[field_name]["values"])
+        for field_name in CLASSIFICATION_MAPPING
+        if field_name in merged_fields
+    }
+
+
+def process_pdf(
+    extractor: Extractor,
+    path: str,
+    trace: Optional[Trace] = None,
+    plan: str = DEFAULT_PASS_PLAN,
+) -> dict:
+    """Run the full pipeline over one drawing."""
+    trace = trace or Trace("process_pdf", file=path)
+    with trace.span("pdf_open"):
+        pdf = pdfplumber.open(path)
+    with pdf:
+        with trace.span("extract_text", pages=len(pdf.pages)):
+            text_blob, notes_blob, pages = read_pdf_text(pdf)
+    result = extract_fields(extractor, text_blob, notes_blob, pages, trace, plan)
+    with trace.span("classify"):
+        result["classifications"] = classify_fields(result["merged"])
+    return result
+
+
+def annotate_page(image, boxes, resolution):
+    """Draw boxes given in PDF points onto a page rendered at resolution."""
+    scale = resolution / 72
+    draw = ImageDraw.Draw(image)
+    for box in boxes:
+        padding = box["padding"]
+        draw.rectangle(
+            [
+                (box["x0"] - padding) * scale,
+                (box["y0"] - padding) * scale,
+                (box["x1"] + padding) * scale,
+                (box["y1"] + padding) * scale,
+            ],
+            outline=box["color"],
+            width=max(1, round(box["width"] * scale)),
+        )
+    return image
+
+
+# --- Batch CLI ---
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of PDF paths."""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            item = os.path.join(item, "**", "*.pdf")
+        for path in glob.glob(item, recursive=True):
+            if path.lower().endswith(".pdf") and os.path.isfile(path):
+                paths.add(path)
+    return sorted(paths)
+
+
+def output_paths(paths: List[str], output_dir: str) -> Dict[str, str]:
+    """Map each drawing to its JSON result path under output_dir.
+
+    Results mirror the drawings' paths relative to their common folder, so
+    drawings with the same name in different folders never collide.
+    """
+    if not paths:
+        return {}
+    root = os.path.commonpath(
+        [os.path.dirname(os.path.abspath(path)) for path in paths]
+    )
+    return {
+        path: os.path.join(
+            output_dir,
+            os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] + ".json",
+        )
+        for path in paths
+    }
+
+
+def run_batch(
+    paths: List[str],
+    extractor: Extractor,
+    output_dir: str,
+    jsonl_path: Optional[str] = None,
+    workers: int = 4,
+    trace_path: Optional[str] = None,
+    plan: str = DEFAULT_PASS_PLAN,
+) -> int:
+    """Process drawings with bounded concurrency; return the number that failed.
+
+    Each drawing is written to <output_dir>/<relative path>.json as soon as
+    it completes, and appended to the JSONL file if one is given. Stage spans
+    of every drawing are appended to trace_path as JSONL, if given.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jsonl = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+    traces = {path: Trace("process_pdf", file=path) for path in paths}
+    outputs = output_paths(paths, output_dir)
+    failures = 0
+    llm_merges = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(process_pdf, extractor, path, traces[path], plan): path
+                for path in paths
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                path = futures[future]
+                try:
+                    record = {"file": path, **future.result()}
+                except Exception as e:
+                    record = {"file": path, "error": str(e)}
+                if "error" in record:
+                    failures += 1
+
+                output_path = outputs[path]
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with open(output_path, "w", encoding="utf-8") as f:
+                    json.dump(record, f, indent=2)
+                if jsonl:
+                    jsonl.write(json.dumps(record) + "\n")
+                    jsonl.flush()
+                if trace_path:
+                    with open(trace_path, "a", encoding="utf-8") as f:
+                        f.write(traces[path].to_jsonl())
+
+                if record.get("merge_mode") == "llm":
+                    llm_merges += 1
+                status = "failed" if "error" in record else record["merge_mode"]
+                print(f"[{done}/{len(paths)}] {status}: {path}", file=sys.stderr)
+    finally:
+        if jsonl:
+            jsonl.close()
+
+    print(
+        f"LLM merge fallback for {llm_merges} of {len(paths) - failures} drawings",
+        file=sys.stderr,
+    )
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Extract PMI from a folder of manufacturing drawings."
+    )
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or globs")
+    parser.add_argument("--output-dir", default="pmi_results")
+    parser.add_argument("--jsonl", help="also append every result to this JSONL file")
+    parser.add_argument(
+        "--workers", type=int, default=4, help="drawings processed concurrently"
+    )
+    parser.add_argument(
+        "--trace", help="append per-stage timing spans to this JSONL file"
+    )
+    parser.add_argument(
+        "--pass-plan",
+        choices=sorted(PASS_PLANS),
+        default=DEFAULT_PASS_PLAN,
+        help="which fields each LLM pass extracts",
+    )
+    args = parser.parse_args(argv)
+
+    # OPENAI_API_KEY may come from a local .env file
+    load_dotenv()
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no PDF files matched the inputs")
+
+    failures = run_batch(
+        paths,
+        default_extractor(),
+        args.output_dir,
+        args.jsonl,
+        args.workers,
+        args.trace,
+        args.pass_plan,
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
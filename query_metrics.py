@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+from llama_index.core.utils import get_tokenizer
+
+# Per-query fields summarized as percentiles, in display order
+SUMMARY_FIELDS = [
+    "retrieve_ms",
+    "postprocess_ms",
+    "ttft_ms",
+    "total_ms",
+    "chunks",
+    "chunk_chars",
+    "prompt_tokens",
+    "completion_tokens",
+]
+
+
+def _reported_usage(response) -> Optional[Tuple[int, int]]:
+    """Return (prompt, completion) tokens as reported by the API, if present."""
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if isinstance(usage, dict):
+        usage = SimpleNamespace(**usage)
+    prompt = getattr(usage, "prompt_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    if prompt is None or completion is None:
+        return None
+    return prompt, completion
+
+
+class QueryMetricsStore:
+    """Rolling window of per-query metrics shared by all sessions."""
+
+    def __init__(self, max_queries: int = 1000):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_queries)
+
+    def add(self, record: dict):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self) -> List[dict]:
+        with self._lock:
+            return list(self._records)
+
+    def percentiles(self, fields: List[str] = SUMMARY_FIELDS) -> Dict[str, dict]:
+        """Return p50 and p95 of each field over the answered (uncached) queries."""
+        answered = [record for record in self.records() if not record["cache_hit"]]
+        summary = {}
+        for field in fields:
+            values = [record[field] for record in answered if field in record]
+            if values:
+                p50, p95 = np.percentile(values, [50, 95])
+                summary[field] = {"p50": round(p50, 1), "p95": round(p95, 1)}
+        return summary
+
+    def cache_hit_rate(self) -> Optional[float]:
+        records = self.records()
+        if not records:
+            return None
+        return sum(record["cache_hit"] for record in records) / len(records)
+
+    def slowest_documents(self, top_n: int = 5) -> List[dict]:
+        """Return the source files whose queries took longest on average."""
+        totals = defaultdict(list)
+        for record in self.records():
+            if record["cache_hit"]:
+                continue
+            for file_name in record.get("files", []):
+                totals[file_name].append(record["total_ms"])
+        ranked = sorted(
+            (
+                {
+                    "file": file_name,
+                    "queries": len(times),
+                    "mean_total_ms": round(sum(times) / len(times), 1),
+                }
+                for file_name, times in totals.items()
+            ),
+            key=lambda row: row["mean_total_ms"],
+            reverse=True,
+        )
+        return ranked[:top_n]
+
+
+class QueryMetricsHandler(BaseCallbackHandler):
+    """llama_index callback handler timing the stages of each chat query.
+
+    A query is tracked from ``track`` until its answer has been streamed.
+    Query engines are shared between sessions, so events are attributed to
+    the query running on the same thread; events outside a tracked query,
+    such as embeddings during indexing, are ignored.
+    """
+
+    def __init__(self, store: QueryMetricsStore):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self.store = store
+        self._local = threading.local()
+        self._tokenizer = get_tokenizer()
+
+    def _record(self) -> Optional[dict]:
+        return getattr(self._local, "record", None)
+
+    @contextmanager
+    def track(self, question: str):
+        """Collect the metrics of one query and store them when it completes."""
+        record = {
+            "question": question,
+            "cache_hit": False,
+            "started": time.perf_counter(),
+            "timestamp": time.time(),
+            "event_starts": {},
+        }
+        self._local.record = record
+        try:
+            yield record
+        finally:
+            self._local.record = None
+            record["total_ms"] = (time.perf_counter() - record.pop("started")) * 1000
+            record.pop("llm_started", None)
+            del record["event_starts"]
+            self.store.add(record)
+
+    def stream(self, tokens: Iterator[str]) -> Iterator[str]:
+        """Pass a token stream through, noting when the first token arrives."""
+        record = self._record()
+        for token in tokens:
+            if record is not None:
+                self._first_token(record, time.perf_counter())
+            yield token
+
+    def _first_token(self, record: dict, now: float):
+        """Record the time to first token, measured from the first LLM call."""
+        if "ttft_ms" not in record and "llm_started" in record:
+            record["ttft_ms"] = (now - record["llm_started"]) * 1000
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text))
+
+    def on_event_start(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict] = None,
+        event_id: str = "",
+        parent_id: str = "",
+        **kwargs,
+    ) -> str:
+        record = self._record()
+        if record is not None:
+            now = time.perf_counter()
+            record["event_starts"][event_id] = now
+            if event_type == CBEventType.LLM:
+                record.setdefault("llm_started", now)
+        return event_id
+
+    def on_event_end(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict] = None,
+        event_id: str = "",
+        **kwargs,
+    ) -> None:
+        record = self._record()
+        if record is None or event_id not in record["event_starts"]:
+            return
+        now = time.perf_counter()
+        elapsed = (now - record["event_starts"].pop(event_id)) * 1000
+        payload = payload or {}
+
+        if event_type == CBEventType.RETRIEVE:
+            # Nested retrievers end first; the outermost one is the longest
+            if elapsed >= record.get("retrieve_ms", 0.0):
+                nodes = payload.get(EventPayload.NODES) or []
+                record["retrieve_ms"] = elapsed
+                record["chunks"] = len(nodes)
+                record["chunk_chars"] = sum(len(n.node.get_content()) for n in nodes)
+                record["files"] = sorted(
+                    {n.node.metadata.get("file_name", "") for n in nodes} - {""}
+                )
+        elif event_type == CBEventType.NODE_POSTPROCESSING:
+            record["postprocess_ms"] = record.get("postprocess_ms", 0.0) + elapsed
+        elif event_type == CBEventType.LLM:
+            record["llm_ms"] = record.get("llm_ms", 0.0) + elapsed
+            # Without streaming the first token arrives with the completion
+            self._first_token(record, now)
+            self._record_tokens(record, payload)
+
+    def _record_tokens(self, record: dict, payload: dict):
+        response = payload.get(EventPayload.RESPONSE) or payload.get(
+            EventPayload.COMPLETION
+        )
+        counts = _reported_usage(response)
+        if counts is None:
+            # Streamed completions report no usage, so count with the tokenizer
+            messages = payload.get(EventPayload.MESSAGES)
+            if messages:
+                prompt = "\n".join(str(message) for message in messages)
+            else:
+                prompt = str(payload.get(EventPayload.PROMPT, ""))
+            message = getattr(response, "message", None)
+            completion = getattr(message, "content", None) or str(response or "")
+            counts = (self._count_tokens(prompt), self._count_tokens(completion))
+
+        record["prompt_tokens"] = record.get("prompt_tokens", 0) + counts[0]
+        record["completion_tokens"] = record.get("completion_tokens", 0) + counts[1]
+
+    def start_trace(self, trace_id: Optional[str] = None) -> None:
+        pass
+
+    def end_trace(
+        self,
+        trace_id: Optional[str] = None,
+        trace_map: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        pass
@@ -2,26 +2,142 @@
 
 import os
 import streamlit as st
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
+from llama_index.core import Settings
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
+from answer_cache import AnswerCache
+from datasheet_index import (
+    DOCS_DIR,
+    IndexRegistry,
+    current_version,
+    load_manifest,
+    sync_index,
+)
+from disk_cache import DiskCache
+from embedding_cache import (
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_CACHE_PATH,
+    CachedEmbedding,
+)
+from hybrid_retrieval import BM25Index, HybridRetriever
+from llm_scheduler import BATCH, INTERACTIVE, lane, scheduled_http_client, scheduler
+from query_metrics import SUMMARY_FIELDS, QueryMetricsHandler, QueryMetricsStore
 
 # Set OpenAI API key from Streamlit secrets
 os.environ["OPENAI_API_KEY"] = st.secrets["OPENAI_API_KEY"]
 
 
+@st.cache_resource
+def get_embed_model():
+    """Return the process-wide embedding model backed by the on-disk cache."""
+    cache = DiskCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES)
+    # Query embeddings are interactive; indexing switches to the batch lane
+    embed_model = OpenAIEmbedding(http_client=scheduled_http_client(INTERACTIVE))
+    return CachedEmbedding(embed_model, cache)
+
+
+Settings.embed_model = get_embed_model()
+
+
+@st.cache_resource
+def get_query_metrics():
+    """Return the callback handler collecting per-query metrics for all sessions."""
+    return QueryMetricsHandler(QueryMetricsStore())
+
+
+query_metrics = get_query_metrics()
+Settings.callback_manager = CallbackManager([query_metrics])
+
+# Render answers token by token instead of after the full completion
+STREAM_ANSWERS = True
+
+# Chunks sent to the LLM, and candidates taken from each retriever before fusion
+RETRIEVAL_TOP_K = 2
+RETRIEVAL_CANDIDATE_K = 10
+
+# Cosine similarity above which a question reuses a cached answer
+ANSWER_CACHE_SIMILARITY = 0.95
+ANSWER_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+
+@st.cache_resource
+def get_answer_cache():
+    """Return the process-wide cache of answers to repeated questions."""
+    return AnswerCache(
+        get_embed_model(),
+        similarity_threshold=ANSWER_CACHE_SIMILARITY,
+        ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    )
+
+
+@st.cache_resource
+def get_index_registry():
+    """Return the registry that shares query engines between all sessions."""
+    return IndexRegistry()
+
+
+def build_query_engine(progress=None):
+    """Sync the persisted index with the document directory and query it."""
+    # Only new or changed files are embedded; the rest come from the store
+    with lane(BATCH):
+        index, _ = sync_index(progress=progress)
+    callback_manager = Settings.callback_manager
+    retriever = HybridRetriever(
+        index.as_retriever(similarity_top_k=RETRIEVAL_CANDIDATE_K),
+        BM25Index(list(index.docstore.docs.values())),
+        top_k=RETRIEVAL_TOP_K,
+        candidate_k=RETRIEVAL_CANDIDATE_K,
+        callback_manager=callback_manager,
+    )
+    llm = OpenAI(
+        temperature=0.0,
+        http_client=scheduled_http_client(INTERACTIVE),
+        callback_manager=callback_manager,
+    )
+    return RetrieverQueryEngine.from_args(
+        retriever,
+        llm=llm,
+        streaming=STREAM_ANSWERS,
+        callback_manager=callback_manager,
+    )
+
+
+def lease_query_engine(progress=None):
+    """Point this session at the shared query engine for the current corpus."""
+    version = current_version()
+    if version is None:
+        return None
+
+    lease = get_index_registry().acquire(version, lambda: build_query_engine(progress))
+    # Release the old lease only after acquiring the new one, so an unchanged
+    # corpus is never unloaded in between
+    previous = st.session_state.get("index_lease")
+    st.session_state.index_lease = lease
+    if previous is not None:
+        previous.release()
+    return lease.value
+
+
 def index_documents(uploaded_files):
     """Index uploaded documents and return a query engine."""
-    os.makedirs("uploaded_docs", exist_ok=True)
+    os.makedirs(DOCS_DIR, exist_ok=True)
     for uploaded_file in uploaded_files:
-        filepath = os.path.join("uploaded_docs", uploaded_file.name)
+        filepath = os.path.join(DOCS_DIR, uploaded_file.name)
         with open(filepath, "wb") as f:
             f.write(uploaded_file.getbuffer())
 
-    with st.spinner("Reading and indexing the documents..."):
-        docs = SimpleDirectoryReader("uploaded_docs").load_data()
-        llm = OpenAI(temperature=0.0)
-        index = VectorStoreIndex.from_documents(docs, llm=llm)
-        return index.as_query_engine()
+    progress_bar = st.progress(0.0, text="Reading and indexing the documents...")
+
+    def report(done, total):
+        progress_bar.progress(
+            done / total, text=f"Reading and indexing pages ({done}/{total})..."
+        )
+
+    query_engine = lease_query_engine(progress=report)
+    progress_bar.empty()
+    return query_engine
 
 
 st.set_page_config(page_title="Document Chat Assistant", layout="centered")
@@ -31,19 +147,35 @@ st.title("📄 Documentation Informed Customer Support - Demo")
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "query_engine" not in st.session_state:
-    st.session_state.query_engine = None
+    # Reuse the index persisted by earlier sessions so cold starts skip embedding
+    st.session_state.query_engine = lease_query_engine() if load_manifest() else None
 if "question_count" not in st.session_state:
     st.session_state.question_count = 0
+if "indexed_files" not in st.session_state:
+    st.session_state.indexed_files = set()
 
 # File uploader
 uploaded_files = st.file_uploader(
     "Upload documents", type=["pdf", "txt"], accept_multiple_files=True
 )
 
-if uploaded_files and st.session_state.query_engine is None:
-    st.session_state.query_engine = index_documents(uploaded_files)
+new_files = [
+    f for f in uploaded_files or [] if f.name not in st.session_state.indexed_files
+]
+if new_files:
+    st.session_state.query_engine = index_documents(new_files)
+    st.session_state.indexed_files.update(f.name for f in new_files)
+    # Unreadable files are skipped by the sync and recorded in the manifest
+    failed = {
+        name: entry["error"]
+        for name, entry in load_manifest().items()
+        if "error" in entry and name in {f.name for f in new_files}
+    }
+    for name, error in failed.items():
+        st.warning(f"Could not read {name}, so it was skipped: {error}")
+    indexed = len(uploaded_files) - len(failed)
     st.success(
-        f"Successfully indexed {len(uploaded_files)} document(s)! You can now ask questions about them."
+        f"Successfully indexed {indexed} document(s)! You can now ask questions about them."
     )
 
 # Display chat messages
@@ -65,13 +197,57 @@ if prompt := st.chat_input("Ask a question about the document"):
 
         # Get response from query engine if document is loaded
         if st.session_state.query_engine:
-            response = st.session_state.query_engine.query(prompt)
+            version = st.session_state.index_lease.version
+            answer_cache = get_answer_cache()
             with st.chat_message("assistant"):
-                st.markdown(response.response)
-            st.session_state.messages.append(
-                {"role": "assistant", "content": response.response}
-            )
+                # Repeated questions skip both retrieval and the LLM call
+                with query_metrics.track(prompt) as record:
+                    answer = answer_cache.lookup(version, prompt)
+                    record["cache_hit"] = answer is not None
+                    if answer is not None:
+                        st.markdown(answer)
+                    else:
+                        response = st.session_state.query_engine.query(prompt)
+                        if STREAM_ANSWERS:
+                            answer = st.write_stream(
+                                query_metrics.stream(response.response_gen)
+                            )
+                        else:
+                            answer = response.response
+                            st.markdown(answer)
+                        answer_cache.store(version, prompt, answer)
+            st.session_state.messages.append({"role": "assistant", "content": answer})
             st.session_state.question_count += 1
         else:
             with st.chat_message("assistant"):
                 st.error("Please upload a document first to ask questions about it.")
+
+# Drawn last so the metrics include the question just answered
+with st.sidebar:
+    st.markdown("**Query latency**")
+    metrics_store = query_metrics.store
+    percentiles = metrics_store.percentiles()
+    if percentiles:
+        st.dataframe(
+            [
+                {"metric": field, **percentiles[field]}
+                for field in SUMMARY_FIELDS
+                if field in percentiles
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption(
+            f"Last {len(metrics_store.records())} queries, "
+            f"{metrics_store.cache_hit_rate():.0%} served from the answer cache"
+        )
+        st.markdown("**Slowest documents**")
+        st.dataframe(
+            metrics_store.slowest_documents(),
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.caption("No questions answered yet.")
+    with st.expander("OpenAI request queue"):
+        st.json(scheduler.metrics())
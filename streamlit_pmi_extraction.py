@@ -1,23 +1,70 @@
 # streamlit_app.py
 
 import streamlit as st
-import pdfplumber
+import hashlib
 import json
-import io
-import openai
-from collections import defaultdict
-from PIL import ImageDraw
 from extraction_config import (
-    patterns,
-    shared_schema,
-    CLASSIFICATION_MAPPING,
+    pattern_scanner,
     CLASSIFICATION_COLORS,
+    FIELDS_BY_NAME,
+    UI_SECTIONS,
 )
-from typing import List
+from pmi_pipeline import (
+    annotate_page,
+    default_extractor,
+    extract_fields,
+    get_classifications,
+    assemble_text,
+)
+from llm_scheduler import scheduler
+from pdf_artifacts import default_artifact_cache
+from tracing import Trace
+from word_index import PageWordIndex
+from word_store import box_dicts, merge_overlapping, pad_boxes
 
 # --- Set up API key ---
 api_key = st.secrets["OPENAI_API_KEY"]
-client = openai.OpenAI(api_key=api_key)
+
+
+@st.cache_resource
+def get_extractor():
+    """Return the LLM extractor shared by all sessions."""
+    return default_extractor(api_key)
+
+
+extractor = get_extractor()
+
+
+@st.cache_resource
+def get_merge_log():
+    """Return the merge mode used for each drawing processed by this server."""
+    return {}
+
+
+# --- Page rendering ---
+RENDER_DPI_OPTIONS = [72, 100, 150, 200]
+THUMBNAIL_DPI = 24
+THUMBNAILS_PER_ROW = 6
+
+
+@st.cache_resource
+def get_artifact_cache():
+    """Return the on-disk cache of parsed and rendered drawings."""
+    return default_artifact_cache()
+
+
+artifact_cache = get_artifact_cache()
+
+
+def render_page(pdf_hash, page_number, resolution, pdf_bytes, trace):
+    """Return one page rasterized at resolution, rendering it only once."""
+    with trace.span("render_page", page=page_number, dpi=resolution) as span:
+        image, hit = artifact_cache.page_image(
+            pdf_hash, page_number, resolution, pdf_bytes
+        )
+        span.set(cache_hit=hit)
+    return image
+
 
 # --- Streamlit App ---
 st.title("Manufacturing RFQ PMI Extraction")
@@ -25,469 +72,317 @@ st.title("Manufacturing RFQ PMI Extraction")
 uploaded_file = st.file_uploader("Upload a 2D manufacturing diagram PDF", type=["pdf"])
 if uploaded_file:
     with st.spinner("Processing PDF and extracting information..."):
-        pdf_bytes = uploaded_file.read()
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            first_page = pdf.pages[0]
-            words = first_page.extract_words()
-            image = first_page.to_image()
-
-            # Convert to PIL Image for drawing
-            pil_image = image.annotated.copy()  # image.annotated is already a PIL Image
-            draw = ImageDraw.Draw(pil_image)
-
-            # Define colors for different categories
-            category_colors = {
-                "material": (255, 0, 0),  # Red
-                "finish": (0, 255, 0),  # Green
-                "general_tolerance": (0, 0, 255),  # Blue
-                "threads": (255, 165, 0),  # Orange
-                "diameters": (128, 0, 128),  # Purple
-                "standards": (255, 192, 203),  # Pink
-                "weld_requirements": (0, 128, 128),  # Teal
-            }
-
-            # Process text and generate merged_fields first
-            all_text = []
-            note_lines = []
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    lines = text.split("\n")
-                    all_text.extend(lines)
-                    for line in lines:
-                        if any(
-                            k in line.upper()
-                            for k in ["NOTE", "WELD", "COATING", "SURFACE"]
-                        ):
-                            note_lines.append(line.strip())
-
-            text_blob = "\n".join(all_text)
-            notes_blob = "\n".join(note_lines)
-
-            # --- Regex pass ---
-            regex_extracted = defaultdict(set)
-            for label, pattern in patterns.items():
-                for match in pattern.findall(text_blob):
-                    match_text = match[0] if isinstance(match, tuple) else match
-                    if match_text.upper() != "ING":
-                        regex_extracted[label].add(match_text.strip())
-
-            # --- LLM passes ---
-            def llm_pass(prompt_text, name):
-                try:
-                    system_prompt = """Extract ALL quote-relevant manufacturing data. Follow these rules:
-1. Each field MUST contain:
-   - An array of ALL standardized values found (keep these concise and filterable)
-   - A detailed notes field that provides comprehensive context
-   - A sources array containing the evidence for each extraction
-   - For example, rather than 6-12in pipe, extract 6 inch pipe, 8 inch pipe, 10 inch pipe, 12 inch pipe
-   - Specify whatever the diameter is for. E.g. 6 inch pipe, not just 6 inch
-2. Values should be normalized and standardized but MUST be comprehensive:
-   - Extract ALL instances of each type of value, not just a representative sample
-   - Include ALL variations and instances, even if they seem similar
-   - Remove unnecessary details and context from values
-   - Split complex requirements into separate values
-   - Use standard units and formats
-   - Use uppercase for standards and specifications
-3. Notes field should be comprehensive and include:
-   - Full context and requirements
-   - Application-specific details
-   - Location or part-specific information
-   - Relationships between different values
-   - Special instructions or considerations
-   - Any caveats or conditions
-4. Sources must include for EVERY value:
-   - The exact text snippet from the document that supports the extraction
-   - Which value it supports
-   - A few words of surrounding context
-5. Example format showing multiple similar values:
-   "threads": {
-     "values": ["M6x1.0", "M6x1.0", "M8x1.25", "M8x1.25", "1/4-20 UNC"],
-     "notes": "Multiple M6 and M8 threaded holes throughout. M6 holes on front face, M8 on back face, 1/4-20 UNC on mounting bracket.",
-     "sources": [
-       {
-         "text": "M6x1.0 threaded hole",
-         "value": "M6x1.0",
-         "context": "Front face: M6x1.0 threaded hole"
-       },
-       {
-         "text": "M6x1.0 thread",
-         "value": "M6x1.0",
-         "context": "Second M6x1.0 thread on front face"
-       },
-       {
-         "text": "M8x1.25",
-         "value": "M8x1.25",
-         "context": "Back face: 2x M8x1.25"
-       }
-     ]
-   }
-   
-IMPORTANT: Do not summarize or reduce multiple instances to a single value. Extract and list ALL instances, even if they are identical."""
-
-                    response = client.responses.create(
-                        model="gpt-4o-2024-08-06",
-                        input=[
-                            {
-                                "role": "system",
-                                "content": system_prompt,
-                            },
-                            {"role": "user", "content": prompt_text},
-                        ],
-                        text={
-                            "format": {
-                                "type": "json_schema",
-                                "name": name,
-                                "schema": shared_schema,
-                                "strict": True,
-                            }
-                        },
-                    )
-                    return json.loads(response.output_text)
-                except Exception as e:
-                    return {"error": str(e)}
-
-            notes_data = llm_pass(notes_blob, "notes_extraction")
-            doc_data = llm_pass(text_blob, "doc_extraction")
-
-            # --- Merge all fields ---
-            merge_prompt = {
-                "role": "user",
-                "content": (
-                    "Merge field-level extractions from document-wide LLM, notes-only LLM, and regex. "
-                    "Return final values only, deduplicated and domain-cleaned.\n\n"
-                    "Rules:\n"
-                    "1. Standardize and normalize all values\n"
-                    "2. Remove duplicates and similar values\n"
-                    "3. Group related values that represent alternatives\n"
-                    "4. Move contextual details to notes\n"
-                    "5. Keep values concise and filterable\n\n"
-                    f"Document LLM:\n{json.dumps(doc_data)}\n\n"
-                    f"Notes LLM:\n{json.dumps(notes_data)}\n\n"
-                    f"Regex:\n{json.dumps({k: list(v) for k, v in regex_extracted.items()})}"
-                ),
-            }
-
-            merge_response = client.responses.create(
-                model="gpt-4o-2024-08-06",
-                input=[
-                    {
-                        "role": "system",
-                        "content": "Return the most complete and accurate merged manufacturing information in JSON. "
-                        "Ensure values are standardized and normalized, with contextual details in notes.",
-                    },
-                    merge_prompt,
-                ],
-                text={
-                    "format": {
-                        "type": "json_schema",
-                        "name": "merged_fields",
-                        "schema": shared_schema,
-                        "strict": True,
-                    }
-                },
-            )
-
-            merged_fields = json.loads(merge_response.output_text)
-
-            # Add function to find text locations
-            def find_text_locations(page, text, context):
-                """Find the bounding box for a text snippet within a page."""
-                words = page.extract_words()
-                best_match = None  # Initialize best_match at the start
-
-                # First try exact match
-                for word in words:
-                    if text.lower() in word["text"].lower():
-                        return {
-                            "x0": word["x0"],
-                            "y0": word["top"],
-                            "x1": word["x1"],
-                            "y1": word["bottom"],
-                        }
-
-                # If no exact match, try fuzzy matching with context
-                if context:
-                    best_score = 0
-                    for word in words:
-                        if any(
-                            part.lower() in word["text"].lower()
-                            for part in text.split()
-                        ):
-                            # Simple scoring - can be improved
-                            score = sum(
-                                1
-                                for part in text.split()
-                                if part.lower() in word["text"].lower()
-                            )
-                            if score > best_score:
-                                best_score = score
-                                best_match = word
-
-                if best_match:
-                    return {
-                        "x0": best_match["x0"],
-                        "y0": best_match["top"],
-                        "x1": best_match["x1"],
-                        "y1": best_match["bottom"],
-                    }
-
-                return None
-
-            # Draw all annotations on the image
-            # First, draw regex matches
-            for word in words:
-                text = word["text"].upper()
-                x0, top, x1, bottom = (
-                    word["x0"],
-                    word["top"],
-                    word["x1"],
-                    word["bottom"],
+        pdf_bytes = uploaded_file.getvalue()
+        pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        trace = Trace("pmi_extraction", file=uploaded_file.name, pdf_hash=pdf_hash)
+
+        # Words and text of every page; a drawing seen before skips parsing
+        # entirely, and pages are only rasterized when displayed
+        with trace.span("parse_pdf") as span:
+            parsed, hit = artifact_cache.parsed(pdf_hash, pdf_bytes)
+            span.set(cache_hit=hit, pages=len(parsed.page_words))
+        page_words = parsed.page_words
+
+        # Define colors for different categories
+        category_colors = {
+            "material": (255, 0, 0),  # Red
+            "finish": (0, 255, 0),  # Green
+            "general_tolerance": (0, 0, 255),  # Blue
+            "threads": (255, 165, 0),  # Orange
+            "diameters": (128, 0, 128),  # Purple
+            "standards": (255, 192, 203),  # Pink
+            "weld_requirements": (0, 128, 128),  # Teal
+        }
+
+        # Process text and generate merged_fields first
+        text_blob, notes_blob, page_texts = assemble_text(parsed.page_lines)
+        extraction = extract_fields(extractor, text_blob, notes_blob, page_texts, trace)
+        merged_fields = extraction["merged"]
+        merge_log = get_merge_log()
+        merge_log[pdf_hash] = extraction["merge_mode"]
+        if "error" in extraction:
+            st.error(f"Extraction failed: {extraction['error']}")
+
+        # Collect annotation boxes per page, in PDF coordinates
+        page_boxes = [[] for _ in page_words]
+
+        # First, regex matches: one thick padded box per run of overlapping
+        # words of a category, classifying each distinct word text once
+        with trace.span("highlight_words") as span:
+            for page_number, words in enumerate(page_words):
+                categories = words.classify(
+                    lambda text: pattern_scanner.first_category(text.upper())
                 )
-
-                # Check each pattern
-                for category, pattern in patterns.items():
-                    if pattern.search(text):
-                        color = category_colors.get(category, (128, 128, 128))
-                        # Draw thicker rectangle with padding
-                        padding = 6
-                        draw.rectangle(
-                            [
-                                x0 - padding,
-                                top - padding,
-                                x1 + padding,
-                                bottom + padding,
-                            ],
-                            outline=color,
+                for category in set(categories) - {None}:
+                    boxes = pad_boxes(words.boxes[categories == category], 6)
+                    page_boxes[page_number].extend(
+                        box_dicts(
+                            merge_overlapping(boxes),
+                            color=category_colors.get(category, (128, 128, 128)),
                             width=6,
+                            padding=0,
                         )
-                        break  # Stop after first match
+                    )
+            span.set(words=sum(len(words) for words in page_words))
 
-            # Then, process and draw source locations
+        # Then, source locations on the first page that contains them
+        with trace.span("locate_sources"):
+            word_indexes = [PageWordIndex(words) for words in page_words]
             source_locations = []
             for field_name, field_data in merged_fields.items():
                 for source in field_data.get("sources", []):
-                    location = find_text_locations(
-                        first_page, source["text"], source["context"]
-                    )
-                    if location:
+                    for page_number, word_index in enumerate(word_indexes):
+                        location = word_index.locate(source["text"], source["context"])
+                        if not location:
+                            continue
                         source_locations.append(
                             {
                                 "field": field_name,
                                 "value": source["value"],
+                                "page": page_number,
                                 "bbox": location,
                             }
                         )
-                        # Draw the box immediately
-                        draw.rectangle(
-                            [
-                                (location["x0"], location["y0"]),
-                                (location["x1"], location["y1"]),
-                            ],
-                            outline=category_colors.get(field_name, (128, 128, 128)),
-                            width=3,
+                        page_boxes[page_number].append(
+                            {
+                                **location,
+                                "color": category_colors.get(
+                                    field_name, (128, 128, 128)
+                                ),
+                                "width": 3,
+                                "padding": 0,
+                            }
                         )
+                        break
+
+        # Now display the selected page with all annotations
+        st.markdown("### Drawing and Extracted Information")
+
+        page_count = len(page_words)
+        page_col, dpi_col = st.columns([3, 1])
+        with page_col:
+            page_number = st.selectbox(
+                "Page",
+                range(page_count),
+                format_func=lambda i: f"Page {i + 1} of {page_count}",
+                disabled=page_count == 1,
+            )
+        with dpi_col:
+            resolution = st.selectbox("Resolution (DPI)", RENDER_DPI_OPTIONS)
+
+        # Display the image at full width
+        page_image = render_page(pdf_hash, page_number, resolution, pdf_bytes, trace)
+        with trace.span("annotate_page", boxes=len(page_boxes[page_number])):
+            page_image = annotate_page(page_image, page_boxes[page_number], resolution)
+        st.image(
+            page_image,
+            caption=f"Page {page_number + 1} with Extracted Information Highlighted",
+            use_container_width=True,
+        )
+
+        # Add minimal custom CSS for modern look
+        st.markdown(
+            """
+            <style>
+                .chip {
+                    display: inline-block;
+                    padding: 4px 12px;
+                    margin: 4px 4px 4px 0;
+                    border-radius: 16px;
+                    background: linear-gradient(135deg, rgba(173, 216, 230, 0.2), rgba(135, 206, 235, 0.2));
+                    color: #262730;
+                    font-size: 14px;
+                    font-weight: 500;
+                    box-shadow: 0 1px 2px rgba(0,0,0,0.05);
+                    border: 1px solid rgba(135, 206, 235, 0.3);
+                    transition: all 0.2s ease;
+                }
+                
+                .chip:hover {
+                    background: linear-gradient(135deg, rgba(173, 216, 230, 0.3), rgba(135, 206, 235, 0.3));
+                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                    border-color: rgba(135, 206, 235, 0.5);
+                }
+                
+                .notes-container {
+                    margin: 12px 0;
+                    padding: 12px 16px;
+                    background: linear-gradient(135deg, rgba(173, 216, 230, 0.15), rgba(135, 206, 235, 0.15));
+                    border-radius: 8px;
+                    border-left: 3px solid #4ECDC4;
+                }
+                
+                .notes-header {
+                    color: #262730;
+                    font-weight: 600;
+                    margin-bottom: 8px;
+                }
+
+                .notes-content {
+                    color: #262730;
+                    line-height: 1.5;
+                }
+
+                .classification-chip {
+                    display: inline-block;
+                    padding: 4px 12px;
+                    margin: 4px 4px 4px 0;
+                    border-radius: 16px;
+                    color: white;
+                    font-size: 14px;
+                    font-weight: 500;
+                    box-shadow: 0 1px 2px rgba(0,0,0,0.1);
+                }
+
+                .source-reference {
+                    margin: 8px 0;
+                    padding: 8px 12px;
+                    background: linear-gradient(135deg, rgba(173, 216, 230, 0.1), rgba(135, 206, 235, 0.1));
+                    border-radius: 6px;
+                    border-left: 2px solid #4ECDC4;
+                }
+
+                .source-text {
+                    color: #262730;
+                    font-style: italic;
+                }
+
+                .source-value {
+                    color: #4ECDC4;
+                    font-weight: 500;
+                }
+            </style>
+        """,
+            unsafe_allow_html=True,
+        )
+
+        # Add legend
+        st.markdown("**Legend**")
+        legend_cols = st.columns(4)
+        for i, (category, color) in enumerate(category_colors.items()):
+            with legend_cols[i % 4]:
+                st.markdown(
+                    f"<div style='display: flex; align-items: center; margin: 2px 0;'>"
+                    f"<div style='width: 8px; height: 8px; background-color: rgb{color}; margin-right: 4px;'></div>"
+                    f"<div style='font-size: 12px;'>{category.replace('_', ' ').title()}</div>"
+                    f"</div>",
+                    unsafe_allow_html=True,
+                )
 
-            # Now display the image with all annotations
-            st.markdown("### Drawing and Extracted Information")
+        # Update the render_section function
+        def render_section(title, field_name, field_data):
+            if not field_data["values"]:
+                return
 
-            # Display the image at full width
-            st.image(
-                pil_image,
-                caption="Page 1 with Extracted Information Highlighted",
-                use_container_width=True,
+            st.markdown(f"#### {title}")
+
+            # Display values as chips first
+            chips_html = " ".join(
+                [f"<span class='chip'>{value}</span>" for value in field_data["values"]]
             )
+            st.markdown(chips_html, unsafe_allow_html=True)
+
+            # Get and display classifications after values
+            classifications = get_classifications(field_name, field_data["values"])
+            if classifications:
+                tooltip_content = (
+                    FIELDS_BY_NAME[field_name].classification_help
+                    or "No classification criteria defined for this field."
+                )
 
-            # Add minimal custom CSS for modern look
-            st.markdown(
+                st.markdown("**Classification**", help=tooltip_content)
+                classification_chips = []
+                for classification in classifications:
+                    color = CLASSIFICATION_COLORS.get(classification, "#f8f9fa")
+                    classification_chips.append(
+                        f"<span class='classification-chip' style='background-color: {color};'>{classification}</span>"
+                    )
+                st.markdown(" ".join(classification_chips), unsafe_allow_html=True)
+
+            # Show notes if present and not empty
+            if field_data.get("notes") and field_data["notes"].strip():
+                notes_html = f"""
+                    <div class='notes-container'>
+                        <div class='notes-header'>Additional Details</div>
+                        <div class='notes-content'>{field_data["notes"]}</div>
+                    </div>
                 """
-                <style>
-                    .chip {
-                        display: inline-block;
-                        padding: 4px 12px;
-                        margin: 4px 4px 4px 0;
-                        border-radius: 16px;
-                        background: linear-gradient(135deg, rgba(173, 216, 230, 0.2), rgba(135, 206, 235, 0.2));
-                        color: #262730;
-                        font-size: 14px;
-                        font-weight: 500;
-                        box-shadow: 0 1px 2px rgba(0,0,0,0.05);
-                        border: 1px solid rgba(135, 206, 235, 0.3);
-                        transition: all 0.2s ease;
-                    }
-                    
-                    .chip:hover {
-                        background: linear-gradient(135deg, rgba(173, 216, 230, 0.3), rgba(135, 206, 235, 0.3));
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                        border-color: rgba(135, 206, 235, 0.5);
-                    }
-                    
-                    .notes-container {
-                        margin: 12px 0;
-                        padding: 12px 16px;
-                        background: linear-gradient(135deg, rgba(173, 216, 230, 0.15), rgba(135, 206, 235, 0.15));
-                        border-radius: 8px;
-                        border-left: 3px solid #4ECDC4;
-                    }
-                    
-                    .notes-header {
-                        color: #262730;
-                        font-weight: 600;
-                        margin-bottom: 8px;
-                    }
-
-                    .notes-content {
-                        color: #262730;
-                        line-height: 1.5;
-                    }
-
-                    .classification-chip {
-                        display: inline-block;
-                        padding: 4px 12px;
-                        margin: 4px 4px 4px 0;
-                        border-radius: 16px;
-                        color: white;
-                        font-size: 14px;
-                        font-weight: 500;
-                        box-shadow: 0 1px 2px rgba(0,0,0,0.1);
-                    }
-
-                    .source-reference {
-                        margin: 8px 0;
-                        padding: 8px 12px;
-                        background: linear-gradient(135deg, rgba(173, 216, 230, 0.1), rgba(135, 206, 235, 0.1));
-                        border-radius: 6px;
-                        border-left: 2px solid #4ECDC4;
-                    }
-
-                    .source-text {
-                        color: #262730;
-                        font-style: italic;
-                    }
-
-                    .source-value {
-                        color: #4ECDC4;
-                        font-weight: 500;
-                    }
-                </style>
-            """,
-                unsafe_allow_html=True,
+                st.markdown(notes_html, unsafe_allow_html=True)
+
+            # Show sources in a separate section if present
+            if field_data.get("sources"):
+                with st.expander("Source References", expanded=False):
+                    for source in field_data["sources"]:
+                        source_html = f"""
+                            <div class='source-reference'>
+                                <span class='source-text'>"{source['text']}"</span> → 
+                                <span class='source-value'>{source['value']}</span>
+                            </div>
+                        """
+                        st.markdown(source_html, unsafe_allow_html=True)
+
+        # Render sections in the columns given by the field registry
+        for column, sections in zip(st.columns(len(UI_SECTIONS)), UI_SECTIONS):
+            with column:
+                for title, field_name in sections:
+                    render_section(title, field_name, merged_fields[field_name])
+
+        if extraction.get("merge_error") and "error" not in extraction:
+            st.warning(
+                f"LLM merge failed, showing the local merge: {extraction['merge_error']}"
             )
-
-            # Add legend
-            st.markdown("**Legend**")
-            legend_cols = st.columns(4)
-            for i, (category, color) in enumerate(category_colors.items()):
-                with legend_cols[i % 4]:
-                    st.markdown(
-                        f"<div style='display: flex; align-items: center; margin: 2px 0;'>"
-                        f"<div style='width: 8px; height: 8px; background-color: rgb{color}; margin-right: 4px;'></div>"
-                        f"<div style='font-size: 12px;'>{category.replace('_', ' ').title()}</div>"
-                        f"</div>",
-                        unsafe_allow_html=True,
+        fallbacks = sum(mode == "llm" for mode in merge_log.values())
+        st.caption(
+            f"Merged {'by LLM fallback' if extraction['merge_mode'] == 'llm' else 'locally'}"
+            f" · LLM merge fallback on {fallbacks} of {len(merge_log)} drawings"
+        )
+
+        # Thumbnails are drawn last and only on request; the missing ones are
+        # rendered together so the PDF is opened once
+        if page_count > 1 and st.checkbox("Show all pages"):
+            with trace.span("render_thumbnails", pages=page_count) as span:
+                thumbnails, hits = artifact_cache.page_images(
+                    pdf_hash, range(page_count), THUMBNAIL_DPI, pdf_bytes
+                )
+                span.set(cache_hits=sum(hits))
+            thumb_cols = st.columns(min(page_count, THUMBNAILS_PER_ROW))
+            for i, thumbnail in enumerate(thumbnails):
+                with thumb_cols[i % len(thumb_cols)]:
+                    st.image(
+                        thumbnail,
+                        caption=f"Page {i + 1} ({len(page_boxes[i])} highlights)",
+                        use_container_width=True,
                     )
 
-            def get_classifications(field_name: str, values: List[str]) -> List[str]:
-                """Get classifications for a field's values."""
-                if field_name not in CLASSIFICATION_MAPPING:
-                    return []
-
-                classifier = CLASSIFICATION_MAPPING[field_name]
-                classifications = set()
-
-                for value in values:
-                    result = classifier(value)
-                    if result:
-                        if isinstance(result, list):
-                            classifications.update(result)
-                        else:
-                            classifications.add(result)
-
-                return sorted(list(classifications))
-
-            # Update the render_section function
-            def render_section(title, field_data):
-                if not field_data["values"]:
-                    return
-
-                st.markdown(f"#### {title}")
-
-                # Display values as chips first
-                chips_html = " ".join(
-                    [
-                        f"<span class='chip'>{value}</span>"
-                        for value in field_data["values"]
-                    ]
+        with st.expander("🔍 Debug Info (Raw Outputs)"):
+            st.markdown("**LLM Notes Pass**")
+            st.json(extraction["notes_pass"])
+            st.markdown("**LLM Document Pass**")
+            st.json(extraction["doc_pass"])
+            st.markdown("**Fields per LLM Pass**")
+            st.json(extraction["pass_fields"])
+            st.markdown("**Regex Pass**")
+            st.json(extraction["regex"])
+            st.markdown("**Merge Conflicts**")
+            st.json(extraction["merge_conflicts"])
+            st.markdown("**OpenAI Request Queue**")
+            st.json(scheduler.metrics())
+
+            st.markdown("**Stage Timings**")
+            st.dataframe(trace.summary(), use_container_width=True)
+            name = uploaded_file.name.rsplit(".", 1)[0]
+            jsonl_col, otel_col = st.columns(2)
+            with jsonl_col:
+                st.download_button(
+                    "Download trace (JSONL)",
+                    trace.to_jsonl(),
+                    file_name=f"{name}.trace.jsonl",
+                    mime="application/jsonl",
                 )
-                st.markdown(chips_html, unsafe_allow_html=True)
-
-                # Get and display classifications after values
-                classifications = get_classifications(
-                    title.lower(), field_data["values"]
+            with otel_col:
+                st.download_button(
+                    "Download trace (OTLP JSON)",
+                    json.dumps(trace.to_otel()),
+                    file_name=f"{name}.otlp.json",
+                    mime="application/json",
                 )
-                if classifications:
-                    # Define tooltip content based on field type
-                    tooltip_content = {
-                        "diameters": "Class A: 6-8 inch pipe, Class B: 8-10 inch pipe, Class C: 10-12 inch pipe",
-                        "threads": "Light Duty Stud: ≤20mm, Heavy Duty Stud: >20mm, Standard Anchor: ≤25mm, Heavy Duty Anchor: >25mm, Standard Hole: ≤20mm, Large Hole: >20mm",
-                        "material": "Standard Stainless: 304 series, Marine Grade: 316 series, General Stainless: Other grades, Aircraft Aluminum: 6061, General Aluminum: Other grades, Brass: Decorative/Corrosion Resistant, Bronze: High Strength/Corrosion Resistant, PEEK: High Performance Plastic",
-                    }.get(
-                        title.lower(),
-                        "No classification criteria defined for this field.",
-                    )
-
-                    st.markdown("**Classification**", help=tooltip_content)
-                    classification_chips = []
-                    for classification in classifications:
-                        color = CLASSIFICATION_COLORS.get(classification, "#f8f9fa")
-                        classification_chips.append(
-                            f"<span class='classification-chip' style='background-color: {color};'>{classification}</span>"
-                        )
-                    st.markdown(" ".join(classification_chips), unsafe_allow_html=True)
-
-                # Show notes if present and not empty
-                if field_data.get("notes") and field_data["notes"].strip():
-                    notes_html = f"""
-                        <div class='notes-container'>
-                            <div class='notes-header'>Additional Details</div>
-                            <div class='notes-content'>{field_data["notes"]}</div>
-                        </div>
-                    """
-                    st.markdown(notes_html, unsafe_allow_html=True)
-
-                # Show sources in a separate section if present
-                if field_data.get("sources"):
-                    with st.expander("Source References", expanded=False):
-                        for source in field_data["sources"]:
-                            source_html = f"""
-                                <div class='source-reference'>
-                                    <span class='source-text'>"{source['text']}"</span> → 
-                                    <span class='source-value'>{source['value']}</span>
-                                </div>
-                            """
-                            st.markdown(source_html, unsafe_allow_html=True)
-
-            # Create two columns for the sections
-            col1, col2 = st.columns(2)
-
-            # Render sections in two columns
-            with col1:
-                render_section("Material", merged_fields["material"])
-                render_section("Surface Treatment", merged_fields["finish"])
-                render_section("Tolerances", merged_fields["general_tolerance"])
-                render_section("Surface Roughness", merged_fields["surface_roughness"])
-                render_section("Threads", merged_fields["threads"])
-
-            with col2:
-                render_section("Diameters", merged_fields["diameters"])
-                render_section("Standards", merged_fields["standards"])
-                render_section("Weld Requirements", merged_fields["weld_requirements"])
-                render_section("Cost Drivers", merged_fields["cost_drivers"])
-
-            with st.expander("🔍 Debug Info (Raw Outputs)"):
-                st.markdown("**LLM Notes Pass**")
-                st.json(notes_data)
-                st.markdown("**LLM Document Pass**")
-                st.json(doc_data)
-                st.markdown("**Regex Pass**")
-                st.json({k: list(v) for k, v in regex_extracted.items()})
@@ -0,0 +1,148 @@
+import random
+import re
+from typing import List, Optional
+
+from extraction_config import (
+    classify_diameter,
+    classify_diameters,
+    classify_material,
+    classify_materials,
+    classify_thread,
+    classify_threads,
+)
+
+
+# The scalar classifiers the batch ones replaced, kept as the reference
+def _old_classify_diameter(value: str) -> Optional[List[str]]:
+    matches = re.finditer(r"(\d+(?:\.\d+)?)\s*(mm|in|inch)?", value, re.IGNORECASE)
+    classifications = set()
+    for match in matches:
+        size, unit = float(match.group(1)), match.group(2) or "mm"
+        if unit.lower() in ["mm", "millimeter"]:
+            size = size / 25.4
+        if 6 <= size <= 8:
+            classifications.add("Class A Pipe")
+        elif 8 < size <= 10:
+            classifications.add("Class B Pipe")
+        elif 10 < size <= 12:
+            classifications.add("Class C Pipe")
+    return list(classifications) if classifications else None
+
+
+def _old_classify_thread(value: str) -> Optional[List[str]]:
+    size_matches = re.finditer(r"(\d+(?:\.\d+)?)\s*(mm|in|inch)?", value)
+    type_match = re.search(r"(Stud|Anchor|Hole|Bolt)", value, re.I)
+    classifications = set()
+    thread_type = type_match.group(1).lower() if type_match else "unknown"
+    for match in size_matches:
+        size, unit = float(match.group(1)), match.group(2) or "mm"
+        if unit in ["in", "inch"]:
+            size = size * 25.4
+        if thread_type == "stud":
+            if size <= 20:
+                classifications.add("Light Duty Stud")
+            else:
+                classifications.add("Heavy Duty Stud")
+        elif thread_type == "anchor":
+            if size <= 25:
+                classifications.add("Standard Anchor")
+            else:
+                classifications.add("Heavy Duty Anchor")
+        elif thread_type == "hole":
+            if size <= 20:
+                classifications.add("Standard Hole")
+            else:
+                classifications.add("Large Hole")
+    return list(classifications) if classifications else None
+
+
+def _old_classify_material(value: str) -> Optional[str]:
+    value = value.upper()
+    if "STAINLESS" in value or "SS" in value:
+        if "304" in value:
+            return "Standard Stainless"
+        elif "316" in value:
+            return "Marine Grade Stainless"
+        return "General Stainless"
+    elif "ALUMINUM" in value or "AL" in value:
+        if "6061" in value:
+            return "Aircraft Grade Aluminum"
+        return "General Aluminum"
+    elif "BRASS" in value:
+        return "Decorative/Corrosion Resistant"
+    elif "BRONZE" in value:
+        return "High Strength/Corrosion Resistant"
+    elif "PEEK" in value:
+        return "High Performance Plastic"
+    return None
+
+
+# Fragments joined at random into values; spaces are kept as tokens
+TOKENS = [" ", " ", " "] + (
+    "6 8 10 12 152.4 203.2 254 304.8 7.5 9 11 20 25 0.79 1 0.98 30 304 316 6061 "
+    "mm MM in IN inch Inch x - / ⌀ DIA Stud stud ANCHOR Hole Bolt SS Stainless Al "
+    "Aluminum BRASS bronze PEEK steel M8 thru"
+).split()
+
+
+def _values(seed: int, count: int) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 6)))
+        for _ in range(count)
+    ]
+
+
+def _sorted_or_none(labels):
+    return sorted(labels) if labels else None
+
+
+def test_classify_diameters_matches_scalar_reference():
+    values = _values(1, 2000)
+    for value, labels in zip(values, classify_diameters(values)):
+        assert labels == sorted(_old_classify_diameter(value) or []), value
+        assert _sorted_or_none(classify_diameter(value)) == _sorted_or_none(
+            _old_classify_diameter(value)
+        )
+
+
+def test_classify_threads_matches_scalar_reference():
+    values = _values(2, 2000)
+    for value, labels in zip(values, classify_threads(values)):
+        assert labels == sorted(_old_classify_thread(value) or []), value
+        assert _sorted_or_none(classify_thread(value)) == _sorted_or_none(
+            _old_classify_thread(value)
+        )
+
+
+def test_classify_materials_matches_scalar_reference():
+    values = _values(3, 2000)
+    for value, labels in zip(values, classify_materials(values)):
+        old = _old_classify_material(value)
+        assert labels == ([old] if old else []), value
+        assert classify_material(value) == old
+
+
+def test_range_edges():
+    values = ["6 in", "8 in", "8.01 in", "12 in", "12.01 in", "5.99 in"]
+    assert classify_diameters(values) == [
+        ["Class A Pipe"],
+        ["Class A Pipe"],
+        ["Class B Pipe"],
+        ["Class C Pipe"],
+        [],
+        [],
+    ]
+    assert classify_threads(["Stud 20", "Stud 21", "Anchor 1 in", "Bolt 5"]) == [
+        ["Light Duty Stud"],
+        ["Heavy Duty Stud"],
+        ["Heavy Duty Anchor"],
+        [],
+    ]
+
+
+def test_empty_batches():
+    assert classify_diameters([]) == []
+    assert classify_threads([]) == []
+    assert classify_materials([]) == []
+    assert classify_diameters([""]) == [[]]
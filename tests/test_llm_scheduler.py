@@ -0,0 +1,311 @@
+import json
+import threading
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import llm_scheduler  # noqa: E402
+from llm_scheduler import (  # noqa: E402
+    BATCH,
+    INTERACTIVE,
+    RateLimitScheduler,
+    ScheduledTransport,
+    estimate_request_tokens,
+    lane,
+)
+
+TIMEOUT = 5.0
+
+
+class FakeClock:
+    """Stands in for the time module; only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_scheduler, "time", fake)
+    return fake
+
+
+def _wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _queued(scheduler):
+    return sum(scheduler.metrics()["queued"].values())
+
+
+def _start_acquire(scheduler, name, done, tokens, priority, model=""):
+    """Queue an acquire in a thread and wait until it is waiting."""
+    queued = _queued(scheduler)
+    thread = threading.Thread(
+        target=lambda: done.append((name, scheduler.acquire(tokens, priority, model))),
+        daemon=True,
+    )
+    thread.start()
+    _wait_until(lambda: _queued(scheduler) == queued + 1)
+    return thread
+
+
+def test_limits_use_longest_prefix():
+    scheduler = RateLimitScheduler(
+        100, 10, {"gpt-4o": (1000, 50), "gpt-4o-mini": (2000, 60)}
+    )
+    assert scheduler.limits("gpt-4o-2024-08-06") == (1000, 50)
+    assert scheduler.limits("gpt-4o-mini-2024-07-18") == (2000, 60)
+    assert scheduler.limits("o1") == (100, 10)
+
+
+def test_acquire_charges_at_most_the_budget(clock):
+    scheduler = RateLimitScheduler(1000, 100)
+    assert scheduler.acquire(5000) == 1000
+    assert scheduler.metrics()["budgets"]["unknown"] == {
+        "tokens_available": 0,
+        "requests_available": 99,
+    }
+
+
+def test_lanes_are_served_by_priority_then_arrival(clock):
+    scheduler = RateLimitScheduler(600, 100)
+    scheduler.acquire(600)
+    done = []
+    threads = [
+        _start_acquire(scheduler, "batch 1", done, 600, BATCH),
+        _start_acquire(scheduler, "batch 2", done, 600, BATCH),
+        _start_acquire(scheduler, "interactive 1", done, 600, INTERACTIVE),
+        _start_acquire(scheduler, "interactive 2", done, 600, INTERACTIVE),
+    ]
+    assert done == []
+
+    # Each refund covers exactly one waiting request
+    for served in range(1, len(threads) + 1):
+        scheduler.settle(600, 0)
+        _wait_until(lambda: len(done) == served)
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert [name for name, _ in done] == [
+        "interactive 1",
+        "interactive 2",
+        "batch 1",
+        "batch 2",
+    ]
+    assert scheduler.metrics()["sent"] == {"interactive": 2, "batch": 3}
+
+
+def test_small_request_waits_behind_older_one_of_same_lane(clock):
+    scheduler = RateLimitScheduler(600, 100)
+    scheduler.acquire(500)
+    done = []
+    _start_acquire(scheduler, "large", done, 600, BATCH)
+    small = _start_acquire(scheduler, "small", done, 50, BATCH)
+    # 100 tokens would fit the small request, but the large one is first
+    small.join(0.05)
+    assert done == []
+
+    scheduler.settle(500, 0)
+    _wait_until(lambda: len(done) == 1)
+    assert done[0] == ("large", 600)
+    scheduler.settle(50, 0)
+    _wait_until(lambda: len(done) == 2)
+    assert done[1] == ("small", 50)
+
+
+def test_settle_refunds_against_the_charged_amount(clock):
+    scheduler = RateLimitScheduler(100000, 100)
+    charged = scheduler.acquire(150000)
+    assert charged == 100000
+    # Settling against the estimate instead would leave 150000 - 80000 too much
+    scheduler.settle(charged, 80000)
+    assert scheduler.metrics()["budgets"]["unknown"]["tokens_available"] == 20000
+
+
+def test_settle_charges_overuse_and_never_exceeds_budget(clock):
+    scheduler = RateLimitScheduler(1000, 100)
+    scheduler.settle(scheduler.acquire(100), 1500)
+    assert scheduler.metrics()["budgets"]["unknown"]["tokens_available"] == -500
+    scheduler.settle(0, -5000)
+    assert scheduler.metrics()["budgets"]["unknown"]["tokens_available"] == 1000
+
+
+def test_budget_refills_with_time(clock):
+    scheduler = RateLimitScheduler(600, 60)
+    scheduler.acquire(600)
+    clock.now += 30
+    assert scheduler.metrics()["budgets"]["unknown"] == {
+        "tokens_available": 300,
+        "requests_available": 60,
+    }
+
+
+def test_pause_holds_back_only_that_model(clock):
+    scheduler = RateLimitScheduler(1000, 100)
+    scheduler.pause(5, "gpt-4o")
+    # Another model's budget is unaffected
+    assert scheduler.acquire(10, BATCH, "text-embedding-3-small") == 10
+
+    done = []
+    thread = _start_acquire(scheduler, "paused", done, 10, INTERACTIVE, "gpt-4o")
+    thread.join(0.05)
+    assert done == []
+
+    clock.now += 5
+    # Any budget change wakes the waiters to re-check their delay
+    scheduler.settle(0, 0, "gpt-4o")
+    thread.join(TIMEOUT)
+    assert done == [("paused", 10)]
+    assert scheduler.metrics()["rate_limited"] == 1
+
+
+def test_coalesce_runs_concurrent_calls_once():
+    scheduler = RateLimitScheduler(1000, 100)
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(TIMEOUT)
+        return "result"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(scheduler.coalesce("key", call)),
+            daemon=True,
+        )
+        for _ in range(3)
+    ]
+    threads[0].start()
+    _wait_until(lambda: scheduler.metrics()["in_flight_unique"] == 1)
+    for thread in threads[1:]:
+        thread.start()
+    _wait_until(lambda: scheduler.metrics()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(TIMEOUT)
+
+    assert calls == [1]
+    assert results == ["result"] * 3
+    assert scheduler.metrics()["in_flight_unique"] == 0
+    # Later calls with the same key run again
+    release.set()
+    assert scheduler.coalesce("key", call) == "result"
+    assert len(calls) == 2
+
+
+def test_coalesce_shares_errors():
+    scheduler = RateLimitScheduler(1000, 100)
+    release = threading.Event()
+
+    def call():
+        release.wait(TIMEOUT)
+        raise ValueError("boom")
+
+    errors = []
+
+    def run():
+        try:
+            scheduler.coalesce("key", call)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(2)]
+    threads[0].start()
+    _wait_until(lambda: scheduler.metrics()["in_flight_unique"] == 1)
+    threads[1].start()
+    _wait_until(lambda: scheduler.metrics()["coalesced"] == 1)
+    release.set()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert errors == ["boom", "boom"]
+
+
+def _client(scheduler, handler, priority=BATCH):
+    transport = ScheduledTransport(scheduler, priority, httpx.MockTransport(handler))
+    return httpx.Client(transport=transport, base_url="https://api.openai.com/v1")
+
+
+def test_transport_settles_with_reported_usage(clock):
+    scheduler = RateLimitScheduler(100000, 100)
+    payload = {"model": "gpt-4o-mini", "input": "hello", "max_output_tokens": 200}
+    body = json.dumps(payload).encode()
+
+    def handler(request):
+        return httpx.Response(200, json={"usage": {"total_tokens": 42}})
+
+    with _client(scheduler, handler) as client:
+        response = client.post("/responses", content=body)
+    assert response.json() == {"usage": {"total_tokens": 42}}
+    estimate = estimate_request_tokens("/v1/responses", payload, body)
+    assert estimate > 42
+    budget = scheduler.metrics()["budgets"]["gpt-4o-mini"]
+    assert budget["tokens_available"] == 100000 - 42
+
+
+def test_transport_uses_the_enclosing_lane(clock):
+    scheduler = RateLimitScheduler(100000, 100)
+
+    def handler(request):
+        return httpx.Response(200, json={})
+
+    with _client(scheduler, handler, BATCH) as client:
+        client.post("/embeddings", json={"model": "text-embedding-3-small"})
+        with lane(INTERACTIVE):
+            client.post("/embeddings", json={"model": "text-embedding-3-small"})
+    assert scheduler.metrics()["sent"] == {"interactive": 1, "batch": 1}
+
+
+def test_transport_pauses_model_on_429(clock):
+    scheduler = RateLimitScheduler(100000, 100)
+
+    def handler(request):
+        return httpx.Response(429, headers={"retry-after": "2"}, json={})
+
+    with _client(scheduler, handler) as client:
+        response = client.post("/responses", json={"model": "gpt-4o"})
+    assert response.status_code == 429
+    assert scheduler.metrics()["rate_limited"] == 1
+    assert scheduler._budget("gpt-4o").paused_until == clock.now + 2
+    assert scheduler._budget("gpt-4o-mini").paused_until == 0.0
+
+
+def test_transport_coalesces_identical_requests(clock):
+    scheduler = RateLimitScheduler(100000, 100)
+    release = threading.Event()
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        release.wait(TIMEOUT)
+        return httpx.Response(200, json={"usage": {"total_tokens": 10}})
+
+    responses = []
+    with _client(scheduler, handler) as client:
+
+        def send():
+            responses.append(client.post("/responses", json={"model": "gpt-4o"}))
+
+        threads = [threading.Thread(target=send, daemon=True) for _ in range(2)]
+        threads[0].start()
+        _wait_until(lambda: len(calls) == 1)
+        threads[1].start()
+        _wait_until(lambda: scheduler.metrics()["coalesced"] == 1)
+        release.set()
+        for thread in threads:
+            thread.join(TIMEOUT)
+
+    assert calls == ["/v1/responses"]
+    assert [response.json() for response in responses] == [
+        {"usage": {"total_tokens": 10}}
+    ] * 2
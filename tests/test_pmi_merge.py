@@ -0,0 +1,106 @@
+from extraction_config import FIELD_NAMES
+from pmi_merge import conflicted_fields, empty_fields, merge_locally
+
+
+def _pass(**fields):
+    return {
+        name: {"values": values, "notes": "", "sources": sources}
+        for name, (values, sources) in fields.items()
+    }
+
+
+def _source(text, value):
+    return {"text": text, "value": value}
+
+
+def test_agreeing_passes_merge_without_conflicts():
+    notes = _pass(threads=(["M8 x 1.25"], [_source("M8 x 1.25 THRU", "M8 x 1.25")]))
+    doc = _pass(threads=(["m8x1.25"], [_source("M8 x 1.25  THRU", "M8x1.25")]))
+    merged, conflicts = merge_locally([notes, doc], {})
+    assert conflicts == []
+    assert merged["threads"]["values"] == ["M8x1.25"]
+    assert merged["threads"]["sources"] == [_source("M8 x 1.25 THRU", "M8x1.25")]
+    assert set(merged) == set(FIELD_NAMES)
+
+
+def test_same_text_read_as_disjoint_values_conflicts():
+    notes = _pass(material=(["Steel"], [_source("MATL: STL", "Steel")]))
+    doc = _pass(material=(["Stainless"], [_source("MATL:  STL", "Stainless")]))
+    merged, conflicts = merge_locally([notes, doc], {})
+    assert conflicts == ["material: 'matl: stl' read as ['stainless', 'steel']"]
+    assert conflicted_fields(conflicts) == ["material"]
+    assert merged["material"]["values"] == ["Steel", "Stainless"]
+
+
+def test_overlapping_readings_do_not_conflict():
+    notes = _pass(finish=(["Anodized"], [_source("ANODIZE", "Anodized")]))
+    doc = _pass(
+        finish=(
+            ["Anodized", "Black"],
+            [_source("ANODIZE", "Anodized"), _source("ANODIZE", "Black")],
+        )
+    )
+    _, conflicts = merge_locally([notes, doc], {})
+    assert conflicts == []
+
+
+def test_regex_hit_missing_from_passes_conflicts():
+    doc = _pass(threads=(["M8x1.25"], [_source("M8x1.25", "M8x1.25")]))
+    regex = {"threads": {"M8x1.25": {"M8x1.25"}, "M10": {"M10"}}}
+    _, conflicts = merge_locally([doc], regex)
+    assert conflicts == ["threads: regex hit 'M10' not in any pass"]
+
+
+def test_regex_hit_is_checked_against_its_own_field():
+    # STL only shows up in another field's evidence
+    doc = _pass(cost_drivers=(["STL weldment"], [_source("STL", "STL weldment")]))
+    _, conflicts = merge_locally([doc], {"material": {"STL": {"STL"}}})
+    assert conflicts == ["material: regex hit 'STL' not in any pass"]
+
+
+def test_regex_hit_accounted_for_by_canonical_value_or_quote():
+    doc = _pass(
+        diameters=(["⌀12.5 mm"], []),
+        weld_requirements=(
+            [],
+            [_source("WELD ALL AROUND", "All-around fillet weld")],
+        ),
+    )
+    regex = {
+        "diameters": {"DIA 12.5MM": {"DIA 12.5MM"}},
+        # Labelled by the regex pattern, checked against the aliased field
+        "weld_notes": {"": {"WELD ALL AROUND PER AWS D1.1"}},
+    }
+    _, conflicts = merge_locally([doc], regex)
+    assert conflicts == []
+
+
+def test_all_passes_failed():
+    merged, conflicts = merge_locally(
+        [{"error": "timeout"}, {"error": "timeout"}], {"material": {"STL": {"STL"}}}
+    )
+    assert merged == empty_fields()
+    assert conflicts == ["no LLM pass succeeded"]
+    assert conflicted_fields(conflicts) is None
+
+
+def test_skipped_passes_leave_every_field_empty():
+    merged, conflicts = merge_locally([{}, {}], {})
+    assert merged == empty_fields()
+    assert conflicts == []
+
+
+def test_failed_pass_is_ignored_when_another_succeeded():
+    doc = _pass(material=(["Steel"], []))
+    merged, conflicts = merge_locally([{"error": "timeout"}, doc], {})
+    assert merged["material"]["values"] == ["Steel"]
+    assert conflicts == []
+
+
+def test_conflicted_fields_in_schema_order():
+    conflicts = [
+        "standards: regex hit 'ISO 2768' not in any pass",
+        "material: 'stl' read as ['stainless', 'steel']",
+        "standards: regex hit 'AWS D1.1' not in any pass",
+    ]
+    assert conflicted_fields(conflicts) == ["material", "standards"]
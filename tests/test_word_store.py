@@ -0,0 +1,74 @@
+import numpy as np
+
+from word_store import merge_overlapping
+
+
+def _overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _merge_pairwise(boxes):
+    """Reference merge: union any overlapping pair until none is left."""
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _overlap(boxes[i], boxes[j]):
+                    a, b = boxes[i], boxes.pop(j)
+                    boxes[i] = [
+                        min(a[0], b[0]),
+                        min(a[1], b[1]),
+                        max(a[2], b[2]),
+                        max(a[3], b[3]),
+                    ]
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted(map(tuple, boxes))
+
+
+def _as_set(boxes):
+    return sorted(map(tuple, np.asarray(boxes).tolist()))
+
+
+def test_empty_and_single_box():
+    assert merge_overlapping([]).shape == (0, 4)
+    assert _as_set(merge_overlapping([[0, 0, 1, 1]])) == [(0, 0, 1, 1)]
+
+
+def test_disjoint_boxes_are_kept():
+    boxes = [[0, 0, 1, 1], [2, 0, 3, 1], [0, 2, 1, 3]]
+    assert _as_set(merge_overlapping(boxes)) == _as_set(boxes)
+
+
+def test_touching_boxes_merge():
+    boxes = [[0, 0, 1, 1], [1, 1, 2, 2]]
+    assert _as_set(merge_overlapping(boxes)) == [(0, 0, 2, 2)]
+
+
+def test_overlap_in_x_only_is_not_merged():
+    boxes = [[0, 0, 2, 1], [1, 5, 3, 6]]
+    assert _as_set(merge_overlapping(boxes)) == _as_set(boxes)
+
+
+def test_chain_merges_transitively():
+    boxes = [[0, 0, 2, 2], [1, 1, 3, 3], [2.5, 2.5, 4, 4], [10, 10, 11, 11]]
+    assert _as_set(merge_overlapping(boxes)) == [(0, 0, 4, 4), (10, 10, 11, 11)]
+
+
+def test_union_that_overlaps_a_third_box_merges_again():
+    # Neither box overlaps the third, but their union does
+    boxes = [[0, 0, 1, 5], [0.5, 4, 5, 5], [4, 0, 5, 1.5]]
+    assert _as_set(merge_overlapping(boxes)) == [(0, 0, 5, 5)]
+
+
+def test_matches_pairwise_merge_on_random_boxes():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        corners = rng.integers(0, 40, size=(30, 2))
+        sizes = rng.integers(1, 6, size=(30, 2))
+        boxes = np.hstack([corners, corners + sizes]).astype(np.float32)
+        assert _as_set(merge_overlapping(boxes)) == _merge_pairwise(boxes.tolist())
@@ -0,0 +1,154 @@
+"""Lightweight per-document tracing of pipeline stages.
+
+A ``Trace`` collects one span per stage with its wall time and attributes
+such as token usage and cache hits. Traces export as JSONL, one span per
+line, or as OTLP/JSON spans that an OpenTelemetry collector can ingest.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+def _span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _otel_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otel_attributes(attributes: dict) -> List[dict]:
+    return [
+        {"key": key, "value": _otel_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+class Span:
+    """One timed stage; attributes may be added while it runs."""
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.span_id = _span_id()
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Record attributes such as token counts or cache hits on the span."""
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """Spans of all stages run for one document, safe to record from threads."""
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.root_id = _span_id()
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time the enclosed block as a stage of this trace."""
+        span = Span(name, attributes)
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            span.end_ns = span.start_ns + int(span.duration_ms * 1e6)
+            with self._lock:
+                self.spans.append(span)
+
+    def summary(self) -> List[dict]:
+        """Return one row per span, in start order, for display."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        return [
+            {"stage": span.name, "ms": round(span.duration_ms, 1), **span.attributes}
+            for span in spans
+        ]
+
+    def to_jsonl(self) -> str:
+        """Return the spans as JSON lines tagged with the trace and its attributes."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        lines = [
+            json.dumps(
+                {
+                    "trace_id": self.trace_id,
+                    "trace": self.name,
+                    **self.attributes,
+                    "span": span.name,
+                    "start_ns": span.start_ns,
+                    "duration_ms": round(span.duration_ms, 3),
+                    "error": span.error,
+                    **span.attributes,
+                }
+            )
+            for span in spans
+        ]
+        return "".join(line + "\n" for line in lines)
+
+    def to_otel(self, service_name: str = "pmi-extraction") -> dict:
+        """Return the trace as an OTLP/JSON ExportTraceServiceRequest."""
+        with self._lock:
+            spans = list(self.spans)
+        end_ns = max([span.end_ns for span in spans] + [self.start_ns])
+        root = {
+            "traceId": self.trace_id,
+            "spanId": self.root_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": _otel_attributes(self.attributes),
+        }
+        children = [
+            {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": self.root_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otel_attributes(span.attributes),
+                "status": (
+                    {"code": 2, "message": span.error} if span.error else {"code": 1}
+                ),
+            }
+            for span in spans
+        ]
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otel_attributes({"service.name": service_name})
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "tracing"}, "spans": [root] + children}
+                    ],
+                }
+            ]
+        }
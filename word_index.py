@@ -0,0 +1,131 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from word_store import BOTTOM, TOP, X0, X1, PageWords
+
+# Largest horizontal gap, in line heights, between two words of one phrase
+MAX_WORD_GAP = 1.5
+
+
+def _trigrams(text: str) -> set:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class PageWordIndex:
+    """Lookup structures over the words of one page, built once per page.
+
+    Words are indexed by lowercase text and by character trigram for
+    substring and fuzzy matches. Both indexes are built over the distinct
+    texts of the page rather than every word, and spatial queries are
+    vectorized over the ``PageWords`` box array.
+    """
+
+    def __init__(self, words: PageWords):
+        self.words = words
+        lower_index: Dict[str, int] = {}
+        to_lower = np.array(
+            [lower_index.setdefault(t.lower(), len(lower_index)) for t in words.vocab],
+            dtype=np.int32,
+        )
+        self.lower_vocab = list(lower_index)
+        # Lowercase text code of every word, and the words of each code
+        self.lower_codes = to_lower[words.codes] if len(words) else words.codes
+        order = np.argsort(self.lower_codes, kind="stable")
+        bounds = np.searchsorted(
+            self.lower_codes[order], np.arange(len(self.lower_vocab) + 1)
+        )
+        self.by_text: Dict[str, np.ndarray] = {
+            text: order[bounds[code] : bounds[code + 1]]
+            for code, text in enumerate(self.lower_vocab)
+        }
+        self.by_trigram: Dict[str, set] = defaultdict(set)
+        for code, text in enumerate(self.lower_vocab):
+            for gram in _trigrams(text):
+                self.by_trigram[gram].add(code)
+
+    def containing(self, fragment: str) -> np.ndarray:
+        """Return the positions of words containing fragment, in page order."""
+        fragment = fragment.lower()
+        if len(fragment) < 3:
+            codes = range(len(self.lower_vocab))
+        else:
+            # Intersect posting sets starting from the rarest trigram
+            grams = sorted(
+                _trigrams(fragment), key=lambda g: len(self.by_trigram.get(g, ()))
+            )
+            codes = set(self.by_trigram.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not codes:
+                    break
+                codes &= self.by_trigram.get(gram, set())
+        matches = [code for code in codes if fragment in self.lower_vocab[code]]
+        return np.flatnonzero(np.isin(self.lower_codes, matches))
+
+    def _next_word(self, position: int, text: str) -> Optional[int]:
+        """Return the nearest word right of position on the same line matching text."""
+        candidates = self.by_text.get(text)
+        if candidates is None:
+            return None
+        word = self.words.boxes[position]
+        reach = (word[BOTTOM] - word[TOP]) * MAX_WORD_GAP
+        boxes = self.words.boxes[candidates]
+        mask = (boxes[:, X0] <= word[X1] + reach) & (boxes[:, X1] >= word[X1])
+        mask &= (boxes[:, TOP] <= word[BOTTOM]) & (boxes[:, BOTTOM] >= word[TOP])
+        mask &= (boxes[:, X0] >= word[X0]) & (candidates != position)
+        if not mask.any():
+            return None
+        # Leftmost match; ties go to the first in page order
+        matches = candidates[mask]
+        return int(matches[np.argmin(boxes[mask, X0])])
+
+    def find_span(self, tokens: Sequence[str]) -> Optional[List[int]]:
+        """Return the positions of adjacent words spelling out tokens, if any."""
+        for start in self.by_text.get(tokens[0], ()):
+            span = [int(start)]
+            for token in tokens[1:]:
+                following = self._next_word(span[-1], token)
+                if following is None:
+                    break
+                span.append(following)
+            else:
+                return span
+        return None
+
+    def bbox(self, positions: Sequence[int]) -> dict:
+        """Return the union bounding box of the given words."""
+        return self.words.bbox(positions)
+
+    def locate(self, text: str, context: Optional[str] = None) -> Optional[dict]:
+        """Find the bounding box for a text snippet on the page.
+
+        Tries an exact word, then a run of adjacent words, then a word
+        containing the snippet. With context, falls back to the word
+        containing the most parts of the snippet.
+        """
+        needle = text.lower().strip()
+        if not needle:
+            return None
+        tokens = needle.split()
+
+        if needle in self.by_text:
+            return self.bbox([self.by_text[needle][0]])
+        if len(tokens) > 1:
+            span = self.find_span(tokens)
+            if span:
+                return self.bbox(span)
+        matches = self.containing(needle)
+        if len(matches):
+            return self.bbox([matches[0]])
+
+        if context and len(self.words):
+            scores = np.zeros(len(self.words), dtype=np.int32)
+            for token in tokens:
+                scores[self.containing(token)] += 1
+            # Most parts matched; ties go to the first in page order
+            best = int(np.argmax(scores))
+            if scores[best]:
+                return self.bbox([best])
+
+        return None
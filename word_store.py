@@ -0,0 +1,144 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Columns of a box array
+X0, TOP, X1, BOTTOM = range(4)
+
+
+class PageWords:
+    """The words of one page as parallel arrays.
+
+    Boxes are a (words, 4) float32 array of x0, top, x1, bottom in PDF
+    points. Texts are interned: ``vocab`` holds each distinct text once and
+    ``codes`` maps every word to its entry, so repeated callouts such as
+    "2X" or "M6" cost four bytes per occurrence.
+    """
+
+    def __init__(self, vocab: Sequence[str], codes: np.ndarray, boxes: np.ndarray):
+        self.vocab = list(vocab)
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str], boxes: np.ndarray) -> "PageWords":
+        """Intern a list of word texts alongside their boxes."""
+        index: Dict[str, int] = {}
+        codes = np.fromiter(
+            (index.setdefault(text, len(index)) for text in texts),
+            dtype=np.int32,
+            count=len(texts),
+        )
+        return cls(list(index), codes, boxes)
+
+    @classmethod
+    def from_dicts(cls, words: Sequence[dict]) -> "PageWords":
+        """Build from word dicts as returned by pdfplumber's ``extract_words``."""
+        boxes = np.array(
+            [(w["x0"], w["top"], w["x1"], w["bottom"]) for w in words],
+            dtype=np.float32,
+        )
+        return cls.from_texts([word["text"] for word in words], boxes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def bbox(self, positions: Sequence[int]) -> dict:
+        """Return the union bounding box of the given words."""
+        b = self.boxes[np.asarray(positions)]
+        return {
+            "x0": float(b[:, X0].min()),
+            "y0": float(b[:, TOP].min()),
+            "x1": float(b[:, X1].max()),
+            "y1": float(b[:, BOTTOM].max()),
+        }
+
+    def classify(self, classifier: Callable[[str], Optional[str]]) -> np.ndarray:
+        """Return classifier's label for every word, calling it once per distinct text."""
+        labels = np.empty(len(self.vocab), dtype=object)
+        labels[:] = [classifier(text) for text in self.vocab]
+        return labels[self.codes]
+
+
+def pad_boxes(boxes: np.ndarray, padding: float) -> np.ndarray:
+    """Grow every box by padding on all sides."""
+    return boxes + np.array([-padding, -padding, padding, padding], np.float32)
+
+
+def _overlapping_pairs(boxes: np.ndarray):
+    """Return index pairs of overlapping boxes, for boxes sorted by x0."""
+    n = len(boxes)
+    # Boxes after i whose x0 lies within box i's x extent overlap it in x
+    ends = np.searchsorted(boxes[:, X0], boxes[:, X1], side="right")
+    first, second = [], []
+    active = np.arange(n)
+    step = 1
+    while True:
+        # Only boxes with candidates left this many places on stay active
+        active = active[ends[active] > active + step]
+        if not len(active):
+            break
+        other = active + step
+        overlap = (boxes[other, TOP] <= boxes[active, BOTTOM]) & (
+            boxes[other, BOTTOM] >= boxes[active, TOP]
+        )
+        first.append(active[overlap])
+        second.append(other[overlap])
+        step += 1
+    if not first:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def _components(n: int, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Label the connected components of a graph given as edge arrays."""
+    labels = np.arange(n)
+    while True:
+        low = np.minimum(labels[first], labels[second])
+        updated = labels.copy()
+        np.minimum.at(updated, first, low)
+        np.minimum.at(updated, second, low)
+        # Pointer jumping: follow labels to their own labels
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def _merge_once(boxes: np.ndarray) -> np.ndarray:
+    boxes = boxes[np.argsort(boxes[:, X0], kind="stable")]
+    first, second = _overlapping_pairs(boxes)
+    if not len(first):
+        return boxes
+    _, groups = np.unique(_components(len(boxes), first, second), return_inverse=True)
+    union = np.empty((groups.max() + 1, 4), np.float32)
+    union[:, :2] = np.inf
+    union[:, 2:] = -np.inf
+    np.minimum.at(union[:, X0], groups, boxes[:, X0])
+    np.minimum.at(union[:, TOP], groups, boxes[:, TOP])
+    np.maximum.at(union[:, X1], groups, boxes[:, X1])
+    np.maximum.at(union[:, BOTTOM], groups, boxes[:, BOTTOM])
+    return union
+
+
+def merge_overlapping(boxes: np.ndarray) -> np.ndarray:
+    """Replace overlapping boxes by their union until no two boxes overlap."""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    while len(boxes) > 1:
+        merged = _merge_once(boxes)
+        if len(merged) == len(boxes):
+            break
+        boxes = merged
+    return boxes
+
+
+def box_dicts(boxes: np.ndarray, **style) -> List[dict]:
+    """Turn a box array into the annotation dicts drawn by annotate_page."""
+    return [
+        {"x0": x0, "y0": top, "x1": x1, "y1": bottom, **style}
+        for x0, top, x1, bottom in boxes.tolist()
+    ]